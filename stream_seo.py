@@ -6,10 +6,30 @@ import json
 import os
 import asyncio
 import aiohttp
+import atexit
+import html
+import queue
+import threading
+from collections import deque
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta
+from email.utils import parsedate_to_datetime
 from io import BytesIO
 import random
+import re
+from functools import lru_cache
+from itertools import islice
+from urllib3.util import Retry
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
 
 # ============ 頁面設定 ============
 
@@ -62,6 +82,56 @@ st.markdown("""
         border-left: 4px solid #667eea;
     }
 
+    .mini-stat-card {
+        flex: 1;
+        text-align: center;
+        padding: 0.5rem;
+        background: white;
+        border-radius: 8px;
+        border-left: 3px solid var(--accent, #667eea);
+    }
+
+    .stat-row {
+        display: flex;
+        gap: 0.5rem;
+    }
+
+    .stat-row.wide {
+        gap: 1rem;
+    }
+
+    .stat-row.site-stats {
+        margin-bottom: 0.5rem;
+    }
+
+    .stat-row.site-stats span {
+        flex: 1;
+    }
+
+    .stat-row .stat-card {
+        flex: 1;
+        border-left-color: var(--accent, #667eea);
+    }
+
+    .stat-num {
+        font-size: 1.5rem;
+        font-weight: bold;
+        color: var(--accent, #667eea);
+    }
+
+    .stat-label {
+        font-size: 0.75rem;
+        color: #666;
+    }
+
+    .stat-card .stat-num {
+        font-size: 1.8rem;
+    }
+
+    .stat-card .stat-label {
+        font-size: 0.8rem;
+    }
+
     .keyword-item {
         padding: 0.4rem 0;
         border-bottom: 1px solid #f0f0f0;
@@ -134,6 +204,31 @@ st.markdown("""
     [data-testid="stSidebar"] .stMarkdown p {
         margin-bottom: 0.3rem !important;
     }
+
+    .ranking-table-wrap {
+        overflow: auto;
+        border: 1px solid #E5E7EB;
+        border-radius: 8px;
+    }
+
+    .ranking-table {
+        border-collapse: collapse;
+        width: 100%;
+        font-size: 0.85rem;
+    }
+
+    .ranking-table th {
+        position: sticky;
+        top: 0;
+        background: #F9FAFB;
+        text-align: left;
+    }
+
+    .ranking-table th, .ranking-table td {
+        padding: 0.3rem 0.6rem;
+        border-bottom: 1px solid #F3F4F6;
+        white-space: nowrap;
+    }
 </style>
 """, unsafe_allow_html=True)
 
@@ -155,42 +250,167 @@ def get_project_file(project_id):
     return os.path.join(DATA_DIR, f"project_{project_id}.json")
 
 
+def get_project_log_file(project_id):
+    """獲取專案記錄追加檔 (JSONL) 路徑"""
+    ensure_data_dir()
+    return os.path.join(DATA_DIR, f"project_{project_id}.jsonl")
+
+
+def get_file_signature(file_path):
+    """獲取檔案的 (修改時間, 大小)，檔案不存在時返回 None"""
+    try:
+        stat = os.stat(file_path)
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def get_project_file_signature(project_id):
+    """獲取專案數據檔案及記錄追加檔的簽名，用作快取鍵"""
+    return get_file_signature(get_project_file(project_id)), get_file_signature(get_project_log_file(project_id))
+
+
+@st.cache_resource
+def get_project_data_cache():
+    """跨重跑共用的專案數據快取 {project_id: (檔案簽名, 數據)}"""
+    return {}
+
+
+@st.cache_resource
+def get_project_data_lock():
+    """保護專案數據快取及記錄追加檔的讀寫（各會話在同一進程的不同執行緒中運行）"""
+    return threading.RLock()
+
+
+def write_file_atomic(file_path, data):
+    """先寫入暫存檔再以 os.replace 取代原檔，寫入中途中斷也不會留下殘缺的檔案"""
+    # 各會話在不同執行緒中運行，暫存檔名帶上執行緒 id 以免同時儲存時互相覆蓋
+    tmp_path = f"{file_path}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, file_path)
+
+
+def to_json_bytes(data, indent=True):
+    """序列化為 JSON（UTF-8 bytes），優先使用 orjson"""
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if indent else 0)
+        return orjson.dumps(data, option=option)
+    if indent:
+        return json.dumps(data, ensure_ascii=False, indent=2).encode("utf-8")
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def from_json_bytes(raw):
+    """解析 JSON（bytes 或 str），優先使用 orjson"""
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+@st.cache_data(show_spinner=False, max_entries=4)
+def read_projects_file(signature):
+    """讀取並解析專案列表檔案，以檔案簽名快取（每次回傳獨立副本）"""
+    try:
+        with open(PROJECTS_FILE, "rb") as f:
+            return from_json_bytes(f.read())
+    except:
+        return {"projects": [], "active_project": None}
+
+
 def load_projects():
     """載入所有專案列表"""
     ensure_data_dir()
-    if os.path.exists(PROJECTS_FILE):
-        try:
-            with open(PROJECTS_FILE, "r", encoding="utf-8") as f:
-                return json.load(f)
-        except:
-            return {"projects": [], "active_project": None}
+    signature = get_file_signature(PROJECTS_FILE)
+    if signature is not None:
+        return read_projects_file(signature)
     return {"projects": [], "active_project": None}
 
 
 def save_projects(data):
     """儲存專案列表"""
     ensure_data_dir()
-    with open(PROJECTS_FILE, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+    write_file_atomic(PROJECTS_FILE, to_json_bytes(data))
 
 
 def load_project_data(project_id):
-    """載入特定專案的數據"""
-    file_path = get_project_file(project_id)
-    if os.path.exists(file_path):
-        try:
-            with open(file_path, "r", encoding="utf-8") as f:
-                return json.load(f)
-        except:
-            return {"records": [], "keyword_groups": {}, "settings": {}}
-    return {"records": [], "keyword_groups": {}, "settings": {}}
+    """載入特定專案的數據（基礎 JSON + 記錄追加檔），檔案未變更時直接返回快取"""
+    # 返回的數據由所有會話共用，修改時須建立新的 dict / list 再交給 save_project_data（寫入成功後才替換快取）
+    with get_project_data_lock():
+        cache = get_project_data_cache()
+        signature = get_project_file_signature(project_id)
+        cached = cache.get(project_id)
+        if cached and cached[0] == signature:
+            return cached[1]
+
+        data = {"records": [], "keyword_groups": {}, "settings": {}}
+        file_path = get_project_file(project_id)
+        if os.path.exists(file_path):
+            try:
+                with open(file_path, "rb") as f:
+                    data = from_json_bytes(f.read())
+            except:
+                pass
+
+        log_path = get_project_log_file(project_id)
+        if os.path.exists(log_path):
+            records = data.setdefault("records", [])
+            # 合併後刪除追加檔前中斷時，追加檔中的記錄已在基礎檔中，按 id 去重避免重複
+            seen_ids = {record.get("id") for record in records}
+            with open(log_path, "rb") as f:
+                for line in f:
+                    try:
+                        record = from_json_bytes(line)
+                    except ValueError:
+                        continue
+                    if record.get("id") in seen_ids:
+                        continue
+                    seen_ids.add(record.get("id"))
+                    records.append(record)
+
+        cache[project_id] = (signature, data)
+        return data
 
 
 def save_project_data(project_id, data):
-    """儲存特定專案的數據"""
-    file_path = get_project_file(project_id)
-    with open(file_path, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+    """儲存特定專案的數據（完整重寫，並合併記錄追加檔）"""
+    with get_project_data_lock():
+        write_file_atomic(get_project_file(project_id), to_json_bytes(data))
+
+        log_path = get_project_log_file(project_id)
+        if os.path.exists(log_path):
+            os.remove(log_path)
+
+        get_project_data_cache()[project_id] = (get_project_file_signature(project_id), data)
+
+
+def append_records_to_log(project_id, records):
+    """將記錄追加到記錄追加檔（每行一條）；上次寫入中斷留下無換行的殘行時先補上換行"""
+    with open(get_project_log_file(project_id), "ab+") as f:
+        prefix = b""
+        if f.seek(0, os.SEEK_END):
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b"\n":
+                prefix = b"\n"
+        f.write(prefix + b"".join(to_json_bytes(record, indent=False) + b"\n" for record in records))
+
+
+@st.cache_data(show_spinner=False, max_entries=8)
+def export_project_json(project_id, project_updated, data_signature, _export_data):
+    """匯出專案備份 JSON（緊湊格式），以專案更新時間及數據檔案簽名快取"""
+    return to_json_bytes(_export_data, indent=False)
+
+
+@st.cache_data(show_spinner=False, max_entries=2)
+def export_all_projects_json(projects_signature, data_signatures, _export_data):
+    """匯出所有專案備份 JSON（緊湊格式），以專案列表及各數據檔案簽名快取"""
+    return to_json_bytes(_export_data, indent=False)
+
+
+@st.cache_data(show_spinner=False, max_entries=4)
+def parse_uploaded_json(file_id, _data):
+    """解析上傳的 JSON 備份，以檔案 id 快取，避免每次重跑都重新解析"""
+    return from_json_bytes(_data)
 
 
 def create_project(name, industry, description="", my_sites=None, competitors=None, icon="📊"):
@@ -237,9 +457,10 @@ def delete_project(project_id):
 
     save_projects(projects_data)
 
-    file_path = get_project_file(project_id)
-    if os.path.exists(file_path):
-        os.remove(file_path)
+    for file_path in (get_project_file(project_id), get_project_log_file(project_id)):
+        if os.path.exists(file_path):
+            os.remove(file_path)
+    get_project_data_cache().pop(project_id, None)
 
 
 def update_project(project_id, updates):
@@ -262,39 +483,110 @@ def set_active_project(project_id):
     save_projects(projects_data)
 
 
+def import_projects_backup(imported):
+    """匯入所有專案備份（跳過已存在的專案 id），作為按鈕回調在重跑前執行"""
+    # 回調在頁面的 try/except 之外執行，錯誤存入 session_state 由匯入區顯示
+    try:
+        projects_data = load_projects()
+        existing_ids = {p["id"] for p in projects_data["projects"]}
+        for project in imported["projects"]:
+            if project["id"] not in existing_ids:
+                existing_ids.add(project["id"])
+                projects_data["projects"].append(project)
+                if project["id"] in imported.get("project_data", {}):
+                    save_project_data(project["id"], imported["project_data"][project["id"]])
+
+        save_projects(projects_data)
+        st.session_state.projects_data = load_projects()
+        st.session_state["import_succeeded"] = True
+    except Exception as e:
+        st.session_state["import_error"] = str(e)
+
+
+def import_project_backup(imported):
+    """以新 id 匯入單一專案備份，作為按鈕回調在重跑前執行"""
+    try:
+        # 備份內容來自快取的解析結果，複製後再改 id，避免污染快取
+        project = dict(imported["project"])
+        new_id = f"proj_{datetime.now().strftime('%Y%m%d%H%M%S')}_{random.randint(1000, 9999)}"
+        project["id"] = new_id
+
+        projects_data = load_projects()
+        projects_data["projects"].append(project)
+        save_projects(projects_data)
+        save_project_data(new_id, imported.get("data", {}))
+
+        st.session_state.projects_data = load_projects()
+        st.session_state["import_succeeded"] = True
+    except Exception as e:
+        st.session_state["import_error"] = str(e)
+
+
 def get_active_project():
-    """獲取當前活躍專案"""
+    """獲取當前活躍專案（以專案列表檔案簽名快取於 session_state，任何儲存都會使其失效）"""
+    signature = get_file_signature(PROJECTS_FILE)
+    cached = st.session_state.get("active_project_cache")
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+
     projects_data = load_projects()
     active_id = projects_data.get("active_project")
 
+    active_project = None
     if active_id:
         for project in projects_data["projects"]:
             if project["id"] == active_id:
-                return project
-
-    return None
-
-
-def add_record_to_project(project_id, record):
-    """添加記錄到專案"""
-    record["timestamp"] = datetime.now().isoformat()
-    record["date"] = datetime.now().strftime("%Y-%m-%d")
-    record["time"] = datetime.now().strftime("%H:%M:%S")
-    record["id"] = f"{record['date']}_{record['time'].replace(':', '')}"
+                active_project = project
+                break
 
-    project_data = load_project_data(project_id)
-    project_data["records"].append(record)
-    save_project_data(project_id, project_data)
+    st.session_state["active_project_cache"] = (signature, active_project)
+    return active_project
+
+
+def add_records_to_project(project_id, records):
+    """批量添加記錄到專案（一次寫入記錄日誌及專案列表）"""
+    now = datetime.now()
+    timestamp = now.isoformat()
+    date_str = now.strftime("%Y-%m-%d")
+    time_str = now.strftime("%H:%M:%S")
+    record_id = f"{date_str}_{time_str.replace(':', '')}"
+
+    # 載入、追加及更新快取須在同一鎖內完成，否則其他會話同時追加的記錄可能不在快取的數據中
+    with get_project_data_lock():
+        project_data = load_project_data(project_id)
+
+        # 記錄 id 精確到秒，同一秒內（包括其他會話）新增的記錄加上序號，重播追加檔時以 id 去重
+        existing_ids = {record.get("id") for record in project_data["records"]}
+        for idx, record in enumerate(records):
+            record["timestamp"] = timestamp
+            record["date"] = date_str
+            record["time"] = time_str
+            base_id = record_id if idx == 0 else f"{record_id}_{idx}"
+            new_id, n = base_id, 1
+            while new_id in existing_ids:
+                new_id = f"{base_id}-{n}"
+                n += 1
+            existing_ids.add(new_id)
+            record["id"] = new_id
+
+        append_records_to_log(project_id, records)
+        project_data = {**project_data, "records": project_data["records"] + records}
+        get_project_data_cache()[project_id] = (get_project_file_signature(project_id), project_data)
 
     projects_data = load_projects()
     for project in projects_data["projects"]:
         if project["id"] == project_id:
             project["record_count"] = len(project_data["records"])
-            project["updated"] = datetime.now().isoformat()
+            project["updated"] = timestamp
             break
     save_projects(projects_data)
 
-    return record
+    return records
+
+
+def add_record_to_project(project_id, record):
+    """添加記錄到專案"""
+    return add_records_to_project(project_id, [record])[0]
 
 
 # ============ 行業預設配置 ============
@@ -375,14 +667,21 @@ INDUSTRY_PRESETS = {
 
 # ============ 工具函數 ============
 
-def normalize_domain(domain):
-    """標準化網域名稱"""
-    domain = domain.lower().strip()
-    domain = domain.replace("https://", "").replace("http://", "")
-    domain = domain.rstrip("/")
-    if domain.startswith("www."):
-        domain = domain[4:]
-    return domain
+_DOMAIN_PREFIX_RE = re.compile(r"^(?:https?://)?(?:www\.)?")
+
+
+def normalize_link(link):
+    """標準化網域名稱或連結（去掉協議及 www. 前綴），不快取，供幾乎不重複的完整結果連結使用"""
+    return _DOMAIN_PREFIX_RE.sub("", link.lower().strip()).rstrip("/")
+
+
+@st.cache_resource
+def get_domain_normalizer():
+    """建立帶 lru_cache 的 normalize_domain，跨重跑共用以保留快取"""
+    return lru_cache(maxsize=8192)(normalize_link)
+
+
+normalize_domain = get_domain_normalizer()
 
 
 def get_record_display_name(record):
@@ -393,24 +692,58 @@ def get_record_display_name(record):
     return f"{date} {time_str} ({keyword_count}個關鍵字)"
 
 
+@st.cache_data(show_spinner=False, max_entries=8)
+def get_record_name_index(project_id, data_signature, _records):
+    """建立「顯示名稱 → 記錄索引」映射（由新到舊，同名時保留最新一條），以數據檔案簽名快取"""
+    record_name_to_idx = {}
+    for i, record in enumerate(reversed(_records)):
+        record_name_to_idx.setdefault(get_record_display_name(record), len(_records) - 1 - i)
+    return record_name_to_idx
+
+
 def get_all_sites_from_record(record):
     """從記錄中獲取所有網站"""
-    all_sites = []
-    seen = set()
+    unique_sites = {}
+    for site in record.get("my_sites", []) + record.get("competitors", []):
+        unique_sites.setdefault(normalize_domain(site), site)
+    return list(unique_sites.values())
+
+
+@st.cache_resource
+def get_site_key_indexer():
+    """建立帶 lru_cache 的 get_site_key_index，跨重跑共用以保留快取"""
+    @lru_cache(maxsize=256)
+    def get_site_key_index(keys):
+        """按排名列的鍵組合建立「標準化網域 → 原始鍵」索引（同一網域保留第一個鍵）"""
+        index = {}
+        for key in keys:
+            if key != "keyword":
+                index.setdefault(normalize_domain(key), key)
+        return index
+
+    return get_site_key_index
+
+
+get_site_key_index = get_site_key_indexer()
+
+
+def build_site_key_index(item):
+    """獲取排名列的網域索引；同一記錄的各列鍵組合相同，只需計算一次"""
+    return get_site_key_index(tuple(item))
 
-    for site in record.get("my_sites", []):
-        normalized = normalize_domain(site)
-        if normalized not in seen:
-            seen.add(normalized)
-            all_sites.append(site)
 
-    for site in record.get("competitors", []):
-        normalized = normalize_domain(site)
-        if normalized not in seen:
-            seen.add(normalized)
-            all_sites.append(site)
+def resolve_site_key(rankings, site_normalized):
+    """從第一列找出網站對應的原始鍵（同一記錄各列鍵相同，其他列可直接讀取）"""
+    if not rankings:
+        return None
+    return build_site_key_index(rankings[0]).get(site_normalized)
 
-    return all_sites
+
+def get_site_rank(item, site_key, site_normalized):
+    """讀取排名：優先用預先解析的鍵，鍵不存在時才按該列重新匹配"""
+    if site_key in item:
+        return item[site_key]
+    return item.get(build_site_key_index(item).get(site_normalized))
 
 
 def get_keyword_order_map(record):
@@ -419,6 +752,13 @@ def get_keyword_order_map(record):
     return {kw: idx for idx, kw in enumerate(keywords)}
 
 
+def sort_rankings_by_order(rankings, keyword_order_map):
+    """按關鍵字原始順序排列排名列表（穩定排序，之後按序追加即保持順序）"""
+    if not keyword_order_map:
+        return rankings
+    return sorted(rankings, key=lambda item: keyword_order_map.get(item.get("keyword"), 9999))
+
+
 def analyze_keyword_competition(rankings, site_a, site_b, keyword_order_map=None):
     """分析兩個網站之間的關鍵字競爭"""
     winning = []
@@ -430,21 +770,14 @@ def analyze_keyword_competition(rankings, site_a, site_b, keyword_order_map=None
 
     site_a_normalized = normalize_domain(site_a)
     site_b_normalized = normalize_domain(site_b)
+    site_a_key = resolve_site_key(rankings, site_a_normalized)
+    site_b_key = resolve_site_key(rankings, site_b_normalized)
 
-    for item in rankings:
+    for item in sort_rankings_by_order(rankings, keyword_order_map):
         keyword = item.get("keyword")
 
-        rank_a = None
-        for key in item.keys():
-            if key != "keyword" and normalize_domain(key) == site_a_normalized:
-                rank_a = item.get(key)
-                break
-
-        rank_b = None
-        for key in item.keys():
-            if key != "keyword" and normalize_domain(key) == site_b_normalized:
-                rank_b = item.get(key)
-                break
+        rank_a = get_site_rank(item, site_a_key, site_a_normalized)
+        rank_b = get_site_rank(item, site_b_key, site_b_normalized)
 
         order = keyword_order_map.get(keyword, 9999) if keyword_order_map else 0
 
@@ -467,13 +800,6 @@ def analyze_keyword_competition(rankings, site_a, site_b, keyword_order_map=None
             elif rank_a > rank_b:
                 losing.append({"keyword": keyword, "rank_a": rank_a, "rank_b": rank_b, "order": order})
 
-    winning.sort(key=lambda x: x["order"])
-    losing.sort(key=lambda x: x["order"])
-    only_a.sort(key=lambda x: x["order"])
-    only_b.sort(key=lambda x: x["order"])
-    neither.sort(key=lambda x: x["order"])
-    both_ranked.sort(key=lambda x: x["order"])
-
     return {
         "winning": winning,
         "losing": losing,
@@ -484,101 +810,179 @@ def analyze_keyword_competition(rankings, site_a, site_b, keyword_order_map=None
     }
 
 
-def analyze_site_keywords_detail(rankings, site, warning_threshold=20, keyword_order_map=None):
-    """分析單一網站的關鍵字詳情（帶排名）"""
-    site_normalized = normalize_domain(site)
-
-    details = {
-        "top3": [],
-        "top10": [],
-        "top20": [],
-        "top30": [],
-        "warning": [],
-        "na": []
-    }
+def analyze_sites_keywords_detail(rankings, sites, warning_threshold=20, keyword_order_map=None):
+    """一次遍歷排名列表，分析多個網站的關鍵字詳情，返回 {網站: 詳情}"""
+    all_details = {}
+    site_entries = []
+    for site in dict.fromkeys(sites):
+        site_normalized = normalize_domain(site)
+        details = {
+            "top3": [],
+            "top10": [],
+            "top20": [],
+            "top30": [],
+            "warning": [],
+            "na": []
+        }
+        all_details[site] = details
+        site_entries.append((resolve_site_key(rankings, site_normalized), site_normalized, details))
 
-    for item in rankings:
+    for item in sort_rankings_by_order(rankings, keyword_order_map):
         keyword = item.get("keyword")
         order = keyword_order_map.get(keyword, 9999) if keyword_order_map else 0
 
-        rank = None
-        for key in item.keys():
-            if key != "keyword" and normalize_domain(key) == site_normalized:
-                rank = item.get(key)
-                break
+        for site_key, site_normalized, details in site_entries:
+            rank = get_site_rank(item, site_key, site_normalized)
 
-        if rank is None:
-            details["na"].append({"keyword": keyword, "order": order})
-        else:
-            if rank <= 3:
-                details["top3"].append({"keyword": keyword, "rank": rank, "order": order})
-            elif rank <= 10:
-                details["top10"].append({"keyword": keyword, "rank": rank, "order": order})
-            elif rank <= 20:
-                details["top20"].append({"keyword": keyword, "rank": rank, "order": order})
-            elif rank <= 30:
-                details["top30"].append({"keyword": keyword, "rank": rank, "order": order})
+            if rank is None:
+                details["na"].append({"keyword": keyword, "order": order})
+            else:
+                if rank <= 3:
+                    details["top3"].append({"keyword": keyword, "rank": rank, "order": order})
+                elif rank <= 10:
+                    details["top10"].append({"keyword": keyword, "rank": rank, "order": order})
+                elif rank <= 20:
+                    details["top20"].append({"keyword": keyword, "rank": rank, "order": order})
+                elif rank <= 30:
+                    details["top30"].append({"keyword": keyword, "rank": rank, "order": order})
+
+                if rank > warning_threshold:
+                    details["warning"].append({"keyword": keyword, "rank": rank, "order": order})
+
+    return all_details
+
+
+def analyze_site_keywords_detail(rankings, site, warning_threshold=20, keyword_order_map=None):
+    """分析單一網站的關鍵字詳情（帶排名）"""
+    return analyze_sites_keywords_detail(rankings, [site], warning_threshold, keyword_order_map)[site]
+
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def get_sites_keywords_detail(project_id, results_key, sites, warning_threshold, _rankings, _keyword_order_map):
+    """以專案、結果及閾值快取所有網站的關鍵字詳情"""
+    return analyze_sites_keywords_detail(_rankings, sites, warning_threshold, _keyword_order_map)
+
+
+@st.cache_data(show_spinner=False, max_entries=8)
+def count_group_keywords(project_id, data_signature, _keyword_groups):
+    """統計所有關鍵字組的關鍵字總數，以數據檔案簽名快取"""
+    return sum(len(g.get("keywords", [])) for g in _keyword_groups.values())
 
-            if rank > warning_threshold:
-                details["warning"].append({"keyword": keyword, "rank": rank, "order": order})
 
-    for key in details:
-        details[key].sort(key=lambda x: x["order"])
+@st.cache_data(show_spinner=False, max_entries=8)
+def project_info_markdown(project_id, project_updated, _project):
+    """生成專案資訊表格的 Markdown，以專案更新時間快取"""
+    return f"""
+    | 項目 | 內容 |
+    |------|------|
+    | 專案名稱 | {_project['name']} |
+    | 行業 | {_project['industry']} |
+    | 創建時間 | {_project.get('created', 'N/A')[:10]} |
+    | 最後更新 | {_project.get('updated', 'N/A')[:10]} |
+    | 我的網站 | {', '.join(_project.get('my_sites', [])) or '未設定'} |
+    | 競爭對手 | {', '.join(_project.get('competitors', [])) or '未設定'} |
+    """
 
-    return details
 
+def build_xlsx(sheets):
+    """以 xlsxwriter constant_memory 模式逐行寫出 Excel，回傳 bytes"""
+    # 只有匯出 Excel 時才需要，延遲到首次匯出才載入
+    import xlsxwriter
 
-def export_single_record(record):
-    """匯出單一記錄為 Excel"""
     output = BytesIO()
+    workbook = xlsxwriter.Workbook(output, {"constant_memory": True, "strings_to_urls": False})
+
+    for sheet_name, header, rows in sheets:
+        worksheet = workbook.add_worksheet(sheet_name)
+        worksheet.write_row(0, 0, header)
+        for row_idx, row in enumerate(rows, start=1):
+            worksheet.write_row(row_idx, 0, row)
+
+    workbook.close()
+    return output.getvalue()
+
+
+def rankings_sheet(sheet_name, rankings):
+    """將排名列表轉為 build_xlsx 的工作表 (名稱, 表頭, 資料列)"""
+    header = list(dict.fromkeys(key for item in rankings for key in item))
+    rows = ([item.get(key) for key in header] for item in rankings)
+    return sheet_name, header, rows
+
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def export_all_records(project_id, record_ids, _records):
+    """匯出專案所有記錄為 Excel（每條記錄一個工作表），以記錄 id 快取"""
+    return build_xlsx(
+        rankings_sheet(f"{record.get('date', 'unknown')}_{idx}"[:31], record.get("rankings", []))
+        for idx, record in enumerate(_records)
+    )
+
+
+@st.cache_data(show_spinner=False, max_entries=64, ttl="1h")
+def export_single_record(project_id, record_id, _record):
+    """匯出單一記錄為 Excel，以專案及記錄 id 快取（一小時後過期）"""
+    info_rows = [
+        ["日期", _record.get("date", "")],
+        ["時間", _record.get("time", "")],
+        ["地區", _record.get("region", "")],
+        ["我的網站", ", ".join(_record.get("my_sites", []))],
+        ["競爭對手", ", ".join(_record.get("competitors", []))]
+    ]
+
+    return build_xlsx([
+        rankings_sheet("排名", _record.get("rankings", [])),
+        ("查詢資訊", ["項目", "內容"], info_rows)
+    ])
+
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def export_results_excel(project_id, results_timestamp, _rankings, _serp_data):
+    """匯出搜尋結果為 Excel（排名總覽 + 完整 SERP），以專案及結果時間戳快取"""
+    # 直接從 dict 逐行串流寫出，不再為完整 SERP 建立中間 DataFrame
+    sheets = [rankings_sheet("排名總覽", _rankings)]
+    if any(_serp_data.values()):
+        serp_rows = (
+            [keyword, result.get("actual_rank"), result.get("title"), result.get("link"),
+             result.get("snippet", "")[:200]]
+            for keyword, results_list in _serp_data.items()
+            for result in results_list
+        )
+        sheets.append(("完整SERP", ["關鍵字", "排名", "標題", "網址", "描述"], serp_rows))
+    return build_xlsx(sheets)
 
-    with pd.ExcelWriter(output, engine="openpyxl") as writer:
-        df_rankings = pd.DataFrame(record.get("rankings", []))
-        df_rankings.to_excel(writer, sheet_name="排名", index=False)
-
-        info_data = {
-            "項目": ["日期", "時間", "地區", "我的網站", "競爭對手"],
-            "內容": [
-                record.get("date", ""),
-                record.get("time", ""),
-                record.get("region", ""),
-                ", ".join(record.get("my_sites", [])),
-                ", ".join(record.get("competitors", []))
-            ]
-        }
-        pd.DataFrame(info_data).to_excel(writer, sheet_name="查詢資訊", index=False)
 
-    output.seek(0)
-    return output
+@st.cache_data(show_spinner=False, max_entries=32)
+def export_results_csv(project_id, results_timestamp, previous_record_id, _df_display):
+    """匯出排名表為 CSV，以專案、結果時間戳及對比記錄 id 快取"""
+    output = BytesIO()
+    _df_display.to_csv(output, index=False, encoding="utf-8-sig")
+    return output.getvalue()
 
 
-def create_styled_ranking_dataframe(rankings, my_sites, competitors, warning_threshold, previous_rankings=None):
-    """創建帶樣式的排名 DataFrame"""
-    all_sites = my_sites + competitors
+def create_ranking_dataframe(rankings, my_sites, competitors, warning_threshold, previous_rankings=None):
+    """創建排名 DataFrame 及同形狀的樣式 DataFrame（Styler 留待顯示時才建立）"""
+    # 同一網站同時列為我的網站及競爭對手時只保留一欄
+    all_sites = list(dict.fromkeys(my_sites + competitors))
+    site_norms = [(site, normalize_domain(site)) for site in all_sites]
 
-    display_data = []
+    # 按欄收集顯示值，最後一次建立 DataFrame，省去 pandas 逐行推斷欄位
+    display_columns = {"關鍵字": [], **{site: [] for site in all_sites}}
+    rank_rows = []
     for rank_data in rankings:
-        row = {"關鍵字": rank_data.get("keyword")}
-
-        for site in all_sites:
-            site_normalized = normalize_domain(site)
-            rank = None
+        kw = rank_data.get("keyword")
+        display_columns["關鍵字"].append(kw)
+        row_ranks = {}
 
-            for key in rank_data.keys():
-                if key != "keyword" and normalize_domain(key) == site_normalized:
-                    rank = rank_data.get(key)
-                    break
+        site_keys = build_site_key_index(rank_data)
+        prev_data = previous_rankings.get(kw) if previous_rankings else None
+        prev_keys = build_site_key_index(prev_data) if prev_data is not None else None
 
-            kw = rank_data.get("keyword")
+        for site, site_normalized in site_norms:
+            rank = rank_data.get(site_keys.get(site_normalized))
 
             change = ""
-            if previous_rankings and kw in previous_rankings:
-                prev_data = previous_rankings[kw]
-                prev_rank = None
-                for key in prev_data.keys():
-                    if key != "keyword" and normalize_domain(key) == site_normalized:
-                        prev_rank = prev_data.get(key)
-                        break
+            if prev_keys is not None:
+                prev_rank = prev_data.get(prev_keys.get(site_normalized))
 
                 if prev_rank is not None and rank is not None:
                     diff = prev_rank - rank
@@ -589,57 +993,99 @@ def create_styled_ranking_dataframe(rankings, my_sites, competitors, warning_thr
                     else:
                         change = " ─"
 
-            row[site] = f"{rank}{change}" if rank is not None else "N/A"
-
-        display_data.append(row)
+            display_columns[site].append(f"{rank}{change}" if rank is not None else "N/A")
+            row_ranks[site] = rank
 
-    df_display = pd.DataFrame(display_data)
+        rank_rows.append(row_ranks)
 
-    def style_ranking_cell(val, col_name):
-        is_my_site = col_name in my_sites
+    df_display = pd.DataFrame(display_columns)
 
-        if "N/A" in str(val):
+    def style_ranking_cell(rank, is_my_site):
+        # 直接以數值排名決定樣式，無需從顯示字串解析
+        if rank is None:
             if is_my_site:
                 return "background-color: #FEF2F2; color: #B91C1C;"
             else:
                 return "background-color: #F9FAFB; color: #9CA3AF;"
 
-        try:
-            rank = int(str(val).split()[0])
-
-            if is_my_site:
-                if rank <= 3:
-                    return "background-color: #DBEAFE; color: #1E40AF; font-weight: bold;"
-                elif rank <= 10:
-                    return "background-color: #E0F2FE; color: #0369A1;"
-                elif rank <= 20:
-                    return "background-color: #F0F9FF; color: #0C4A6E;"
-                elif rank > warning_threshold:
-                    return "background-color: #FEE2E2; color: #DC2626; font-weight: bold;"
-                else:
-                    return "background-color: #F8FAFC; color: #475569;"
+        if is_my_site:
+            if rank <= 3:
+                return "background-color: #DBEAFE; color: #1E40AF; font-weight: bold;"
+            elif rank <= 10:
+                return "background-color: #E0F2FE; color: #0369A1;"
+            elif rank <= 20:
+                return "background-color: #F0F9FF; color: #0C4A6E;"
+            elif rank > warning_threshold:
+                return "background-color: #FEE2E2; color: #DC2626; font-weight: bold;"
             else:
-                if rank <= 3:
-                    return "background-color: #FEF3C7; color: #92400E; font-weight: bold;"
-                elif rank <= 10:
-                    return "background-color: #FFFBEB; color: #B45309;"
-                elif rank <= 20:
-                    return "background-color: #F9FAFB; color: #6B7280;"
-                else:
-                    return "background-color: #F3F4F6; color: #9CA3AF;"
-        except:
-            return ""
+                return "background-color: #F8FAFC; color: #475569;"
+        else:
+            if rank <= 3:
+                return "background-color: #FEF3C7; color: #92400E; font-weight: bold;"
+            elif rank <= 10:
+                return "background-color: #FFFBEB; color: #B45309;"
+            elif rank <= 20:
+                return "background-color: #F9FAFB; color: #6B7280;"
+            else:
+                return "background-color: #F3F4F6; color: #9CA3AF;"
+
+    my_sites_set = set(my_sites)
+    # 排名取值有限，按 (是否我的網站, 排名) 查表，每個排名只計算一次樣式
+    style_tables = {True: {}, False: {}}
+
+    def column_styles(col):
+        is_my_site = col in my_sites_set
+        table = style_tables[is_my_site]
+        column = []
+        for row_ranks in rank_rows:
+            rank = row_ranks[col]
+            style = table.get(rank)
+            if style is None:
+                style = table[rank] = style_ranking_cell(rank, is_my_site)
+            column.append(style)
+        return column
+
+    styles = pd.DataFrame({
+        col: [""] * len(df_display) if col == "關鍵字" else column_styles(col)
+        for col in df_display.columns
+    }, index=df_display.index)
+
+    return df_display, styles
+
 
-    def apply_styles(df):
-        styles = pd.DataFrame('', index=df.index, columns=df.columns)
-        for col in df.columns:
-            if col != "關鍵字":
-                styles[col] = df[col].apply(lambda x: style_ranking_cell(x, col))
-        return styles
+@st.cache_data(show_spinner=False, max_entries=128)
+def get_ranking_tables(project_id, record_key, previous_key, my_sites, competitors, warning_threshold,
+                       _rankings, _previous_rankings):
+    """以專案、記錄及對比記錄快取排名表，重跑時不再重建"""
+    return create_ranking_dataframe(_rankings, my_sites, competitors, warning_threshold, _previous_rankings)
 
-    styled_df = df_display.style.apply(lambda _: apply_styles(df_display), axis=None)
 
-    return df_display, styled_df
+STYLED_TABLE_MAX_ROWS = 200
+
+# 歷史記錄每次顯示的條數
+HISTORY_PAGE_SIZE = 25
+
+
+def display_ranking_table(df_display, styles, height):
+    """顯示排名表：小表用 st.dataframe + Styler，大表直接輸出一次性 HTML 表格"""
+    if len(df_display) <= STYLED_TABLE_MAX_ROWS:
+        # 預先算好的樣式表一次套用，Styler 只在實際顯示時建立
+        styled_df = df_display.style.apply(lambda _: styles, axis=None)
+        st.dataframe(styled_df, use_container_width=True, height=height)
+        return
+
+    header = "".join(f"<th>{html.escape(str(col))}</th>" for col in df_display.columns)
+    rows = "".join(
+        "<tr>" + "".join(
+            f'<td style="{style}">{html.escape(str(val))}</td>' for val, style in zip(values, row_styles)
+        ) + "</tr>"
+        for values, row_styles in zip(df_display.itertuples(index=False), styles.itertuples(index=False))
+    )
+    st.markdown(
+        f'<div class="ranking-table-wrap" style="max-height: {height}px;">'
+        f'<table class="ranking-table"><thead><tr>{header}</tr></thead><tbody>{rows}</tbody></table></div>',
+        unsafe_allow_html=True
+    )
 
 
 # ============ 顯示關鍵字列表的函數（一行一個）============
@@ -711,13 +1157,495 @@ def display_keyword_list(keywords_list, rank_class="rank-top10", show_rank=True)
             # 純字串
             st.markdown(f"• {item}")
 
-# ============ 搜尋引擎類別 ============
+
+def select_detail_category(labels, key):
+    """以橫向單選按鈕選擇詳情類別，只渲染選中的類別（st.tabs 會預先渲染所有分頁內容）"""
+    return st.radio("類別", list(labels), format_func=labels.get, horizontal=True, key=key,
+                    label_visibility="collapsed")
+
+
+# 排名總覽的類別：(鍵, 統計卡標籤, 類別選項標籤)
+SITE_OVERVIEW_CATEGORIES = [
+    ("top3", "🏆 前3名", "🏆 前3名"),
+    ("top10", "📄 首頁(4-10)", "📄 首頁"),
+    ("top20", "📑 第2頁(11-20)", "📑 第2頁"),
+    ("top30", "📋 第3頁(21-30)", "📋 第3頁"),
+    ("warning", "⚠️ >{threshold}名", "⚠️ 警告"),
+    ("na", "❌ 未上榜", "❌ 未上榜")
+]
+
+# 我的網站 / 競爭對手的配色及提示：類別 → (顏色, 列表樣式, 有關鍵字時的提示, 沒有關鍵字時的提示)
+SITE_OVERVIEW_CONFIG = {
+    "mine": {
+        "key_prefix": "category_my",
+        "expanded": True,
+        "categories": {
+            "top3": ("#10B981", "rank-top3", None, (st.info, "沒有排在前3名的關鍵字")),
+            "top10": ("#3B82F6", "rank-top10", None, (st.info, "沒有排在4-10名的關鍵字")),
+            "top20": ("#F59E0B", "rank-top20", None, (st.info, "沒有排在11-20名的關鍵字")),
+            "top30": ("#8B5CF6", "rank-top30", None, (st.info, "沒有排在21-30名的關鍵字")),
+            "warning": ("#EF4444", "rank-warning", (st.warning, "⚠️ 以下 {count} 個關鍵字排名超過 {threshold}："),
+                        (st.success, "沒有需要警告的關鍵字！")),
+            "na": ("#6B7280", "rank-na", None, (st.success, "所有關鍵字都有排名！"))
+        }
+    },
+    "competitor": {
+        "key_prefix": "category_competitor",
+        "expanded": False,
+        "categories": {
+            "top3": ("#DC2626", "rank-warning", (st.warning, "⚠️ 競爭對手在這些關鍵字排名很高："),
+                     (st.success, "競爭對手沒有排在前3名的關鍵字")),
+            "top10": ("#F59E0B", "rank-top10", (st.warning, "⚠️ 競爭對手在首頁："),
+                      (st.info, "競爭對手沒有排在4-10名的關鍵字")),
+            "top20": ("#6B7280", "rank-top20", None, (st.info, "競爭對手沒有排在11-20名的關鍵字")),
+            "top30": ("#9CA3AF", "rank-top30", None, (st.info, "競爭對手沒有排在21-30名的關鍵字")),
+            "warning": ("#10B981", "rank-warning", (st.success, "✅ 競爭對手這些關鍵字排名差（>{threshold}）："),
+                        (st.info, "競爭對手沒有排名很差的關鍵字")),
+            "na": ("#10B981", "rank-na", (st.success, "✅ 競爭對手在這些關鍵字沒有排名："),
+                   (st.warning, "競爭對手在所有關鍵字都有排名"))
+        }
+    }
+}
+
+# 單一網站詳細分析：沿用「我的網站」的配色及提示，前3名及未上榜另有提示
+SITE_DETAIL_CATEGORIES = {
+    **SITE_OVERVIEW_CONFIG["mine"]["categories"],
+    "top3": ("#10B981", "rank-top3", (st.success, "🏆 這些關鍵字排名很好！"), (st.info, "沒有排在前3名的關鍵字")),
+    "na": ("#6B7280", "rank-na", (st.error, "❌ 這些關鍵字完全沒有排名："), (st.success, "所有關鍵字都有排名！"))
+}
+
+
+def render_category_keywords(category_config, category, keywords, warning_threshold):
+    """按類別配置顯示選中類別的提示及關鍵字列表"""
+    _, rank_class, notice, empty_notice = category_config[category]
+    if keywords:
+        if notice:
+            notice[0](notice[1].format(count=len(keywords), threshold=warning_threshold))
+        display_keyword_list(keywords, rank_class, show_rank=category != "na")
+    else:
+        empty_notice[0](empty_notice[1])
+
+
+def render_site_overview(sites, site_details, warning_threshold, site_type):
+    """渲染一組網站（我的網站 / 競爭對手）的排名總覽：統計卡 + 選中類別的關鍵字列表"""
+    config = SITE_OVERVIEW_CONFIG[site_type]
+    category_config = config["categories"]
+
+    for site_idx, site in enumerate(sites):
+        analysis = site_details[site]
+
+        with st.expander(f"📊 **{site}**", expanded=config["expanded"]):
+            # 六張統計卡合併為一次 st.markdown 輸出
+            cards_html = "".join(
+                f'<div class="mini-stat-card" style="--accent: {category_config[key][0]};">'
+                f'<div class="stat-num">{len(analysis[key])}</div>'
+                f'<div class="stat-label">{card_label.format(threshold=warning_threshold)}</div></div>'
+                for key, card_label, _ in SITE_OVERVIEW_CATEGORIES
+            )
+            st.markdown(f'<div class="stat-row">{cards_html}</div>', unsafe_allow_html=True)
+
+            st.markdown("---")
+
+            selected_category = select_detail_category(
+                {key: f"{option_label} ({len(analysis[key])})" for key, _, option_label in SITE_OVERVIEW_CATEGORIES},
+                f"{config['key_prefix']}_{site_idx}_{site}"
+            )
+
+            render_category_keywords(category_config, selected_category, analysis[selected_category], warning_threshold)
+
+
+# 舊版 Streamlit 沒有 st.fragment 時退回一般函數（互動時整頁重跑）
+fragment = getattr(st, "fragment", None) or (lambda func: func)
+
+
+@fragment
+def render_history_records(active_project, current_project_data):
+    """顯示歷史記錄頁（載入更多、準備下載只重跑此區塊，刪除記錄時整頁重跑）"""
+    st.markdown("### 📜 歷史記錄")
+    st.caption(f"專案：{active_project['icon']} {active_project['name']}")
+
+    history_records = current_project_data.get("records", [])
+
+    if not history_records:
+        st.info("📊 還沒有歷史記錄")
+    else:
+        st.markdown(f"**共 {len(history_records)} 條記錄**")
+
+        history_warning_threshold = st.number_input(
+            "⚠️ 警告閾值",
+            min_value=10,
+            max_value=100,
+            value=20,
+            step=5,
+            key="history_warning_threshold"
+        )
+
+        st.markdown("---")
+
+        # 只渲染最近的若干條記錄，按「載入更多」逐批增加
+        history_shown = st.session_state.setdefault("history_shown", HISTORY_PAGE_SIZE)
+
+        for i, record in enumerate(islice(reversed(history_records), history_shown)):
+            record_idx = len(history_records) - 1 - i
+            record_date = record.get("date", "未知")
+            record_time = record.get("time", "")
+            record_id = record.get("id", f"record_{i}")
+            keyword_count = len(record.get("rankings", []))
+
+            col1, col2, col3 = st.columns([4, 1, 1])
+
+            with col1:
+                expander_title = f"📅 {record_date} {record_time} | {keyword_count}個關鍵字"
+
+                with st.expander(expander_title, expanded=False):
+                    info_col1, info_col2 = st.columns(2)
+                    with info_col1:
+                        st.markdown("**🏠 網站：**")
+                        st.write(", ".join(record.get("my_sites", [])))
+                    with info_col2:
+                        st.markdown("**🎯 競爭對手：**")
+                        st.write(", ".join(record.get("competitors", [])))
+
+                    st.markdown("---")
+
+                    record_my_sites = record.get("my_sites", [])
+                    record_competitors = record.get("competitors", [])
+                    record_rankings = record.get("rankings", [])
+
+                    prev_record = history_records[record_idx - 1] if record_idx > 0 else {}
+                    prev_rankings_dict = {
+                        item["keyword"]: item for item in prev_record.get("rankings", []) if item.get("keyword")
+                    }
+                    prev_record_id = prev_record.get("id")
+
+                    df_display, ranking_styles = get_ranking_tables(
+                        active_project["id"],
+                        record_id,
+                        prev_record_id,
+                        record_my_sites,
+                        record_competitors,
+                        history_warning_threshold,
+                        record_rankings,
+                        prev_rankings_dict
+                    )
+
+                    display_ranking_table(df_display, ranking_styles, 400)
+
+                    st.markdown("---")
+                    st.markdown("**📊 各網站排名統計：**")
+
+                    all_record_sites = record_my_sites + record_competitors
+                    # 所有網站的詳情一次遍歷算出，並按記錄 id 快取
+                    record_site_details = get_sites_keywords_detail(
+                        active_project["id"], record_id, tuple(all_record_sites), history_warning_threshold,
+                        record_rankings, get_keyword_order_map(record)
+                    )
+                    record_my_set = set(record_my_sites)
+                    site_meta = {
+                        site: ("🏠" if site in record_my_set else "🎯", html.escape(site[:20]))
+                        for site in all_record_sites
+                    }
+
+                    for site in all_record_sites:
+                        site_analysis = record_site_details[site]
+                        site_type, site_label = site_meta[site]
+
+                        # 一個網站一行 HTML，避免每行建立 7 個欄位容器
+                        st.markdown(
+                            f'<div class="stat-row site-stats">'
+                            f'<span><b>{site_type} {site_label}</b></span>'
+                            f'<span>🏆 {len(site_analysis["top3"])}</span>'
+                            f'<span>📄 {len(site_analysis["top10"])}</span>'
+                            f'<span>📑 {len(site_analysis["top20"])}</span>'
+                            f'<span>📋 {len(site_analysis["top30"])}</span>'
+                            f'<span>⚠️ {len(site_analysis["warning"])}</span>'
+                            f'<span>❌ {len(site_analysis["na"])}</span>'
+                            f'</div>',
+                            unsafe_allow_html=True
+                        )
+
+            with col2:
+                # 記錄的 Excel 只在用戶按下「準備」後才生成，之後直接顯示下載按鈕
+                excel_ready_key = f"excel_ready_{active_project['id']}_{record_id}"
+                if not st.session_state.get(excel_ready_key):
+                    st.button("📦 Excel", key=f"prep_excel_{record_id}_{i}",
+                              on_click=st.session_state.__setitem__, args=(excel_ready_key, True))
+                else:
+                    excel_data = export_single_record(active_project["id"], record_id, record)
+                    st.download_button(
+                        label="📥 Excel",
+                        data=excel_data,
+                        file_name=f"{active_project['name']}_{record_date}.xlsx",
+                        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                        key=f"dl_excel_{record_id}_{i}"
+                    )
+
+            with col3:
+                if st.button("🗑️", key=f"del_record_{record_id}_{i}"):
+                    ids_to_delete = {record_id}
+                    # 在鎖內取最新數據，避免覆蓋其他會話剛追加的記錄
+                    with get_project_data_lock():
+                        project_data = load_project_data(active_project["id"])
+                        save_project_data(active_project["id"], {
+                            **project_data,
+                            "records": [r for r in project_data["records"] if r.get("id") not in ids_to_delete]
+                        })
+                    st.success("已刪除")
+                    st.rerun()
+
+        if history_shown < len(history_records):
+            st.button(
+                f"載入更多 {HISTORY_PAGE_SIZE} 條（已顯示 {history_shown} / {len(history_records)}）",
+                on_click=lambda: st.session_state.__setitem__("history_shown", history_shown + HISTORY_PAGE_SIZE),
+                key="history_load_more"
+            )
+
+
+@fragment
+def render_project_data_manager(active_project, current_project_data):
+    """顯示專案數據管理頁（片段內互動只重跑此區塊，數據變更時整頁重跑）"""
+    st.markdown("### ⚙️ 專案數據管理")
+    st.caption(f"專案：{active_project['icon']} {active_project['name']}")
+
+    history_records = current_project_data.get("records", [])
+    keyword_groups = current_project_data.get("keyword_groups", {})
+    data_signature = get_project_file_signature(active_project["id"])
+    export_date = datetime.now().strftime("%Y%m%d")
+
+    col1, col2, col3 = st.columns(3)
+
+    with col1:
+        st.markdown(f"""
+        <div class="stat-card">
+            <div style="font-size: 2rem; font-weight: bold; color: #667eea;">{len(history_records)}</div>
+            <div>總記錄數</div>
+        </div>
+        """, unsafe_allow_html=True)
+
+    with col2:
+        st.markdown(f"""
+        <div class="stat-card">
+            <div style="font-size: 2rem; font-weight: bold; color: #10B981;">{len(keyword_groups)}</div>
+            <div>關鍵字組</div>
+        </div>
+        """, unsafe_allow_html=True)
+
+    with col3:
+        total_keywords = count_group_keywords(active_project["id"], data_signature, keyword_groups)
+        st.markdown(f"""
+        <div class="stat-card">
+            <div style="font-size: 2rem; font-weight: bold; color: #F59E0B;">{total_keywords}</div>
+            <div>總關鍵字數</div>
+        </div>
+        """, unsafe_allow_html=True)
+
+    st.markdown("---")
+
+    col1, col2 = st.columns(2)
+
+    with col1:
+        st.markdown("#### 📤 匯出專案數據")
+
+        if history_records or keyword_groups:
+            export_data = {
+                "project": active_project,
+                "data": current_project_data
+            }
+            json_data = export_project_json(
+                active_project["id"],
+                active_project.get("updated"),
+                data_signature,
+                export_data
+            )
+            st.download_button(
+                label="📥 匯出完整專案 (JSON)",
+                data=json_data,
+                file_name=f"{active_project['name']}_backup_{export_date}.json",
+                mime="application/json",
+                use_container_width=True
+            )
+
+            if history_records:
+                # 所有記錄的 Excel 只在用戶按下「準備」後才生成，數據變更後需重新準備
+                all_records_ready_for = (active_project["id"], data_signature)
+                if st.session_state.get("all_records_excel_ready_for") != all_records_ready_for:
+                    st.button("📦 準備所有記錄 (Excel)", use_container_width=True,
+                              on_click=st.session_state.__setitem__,
+                              args=("all_records_excel_ready_for", all_records_ready_for))
+                else:
+                    all_records_excel = export_all_records(
+                        active_project["id"],
+                        tuple(r.get("id") for r in history_records),
+                        history_records
+                    )
+
+                    st.download_button(
+                        label="📥 匯出所有記錄 (Excel)",
+                        data=all_records_excel,
+                        file_name=f"{active_project['name']}_all_records_{export_date}.xlsx",
+                        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                        use_container_width=True
+                    )
+
+    with col2:
+        st.markdown("#### 🗑️ 清除數據")
+
+        st.button(
+            "🗑️ 清除所有記錄", type="secondary", use_container_width=True,
+            on_click=st.session_state.__setitem__, args=("confirm_clear_records", True)
+        )
+
+        if st.session_state.get("confirm_clear_records"):
+            st.warning("⚠️ 確定要清除所有歷史記錄嗎？")
+            col_yes, col_no = st.columns(2)
+            with col_yes:
+                if st.button("確認清除", key="confirm_clear_yes"):
+                    with get_project_data_lock():
+                        project_data = load_project_data(active_project["id"])
+                        save_project_data(active_project["id"], {**project_data, "records": []})
+                    st.session_state.current_results = None
+                    del st.session_state["confirm_clear_records"]
+                    st.success("✅ 已清除所有記錄")
+                    st.rerun()
+            with col_no:
+                st.button("取消", key="confirm_clear_no", on_click=st.session_state.pop, args=("confirm_clear_records", None))
+
+        st.button(
+            "🗑️ 清除關鍵字組", type="secondary", use_container_width=True,
+            on_click=st.session_state.__setitem__, args=("confirm_clear_groups", True)
+        )
+
+        if st.session_state.get("confirm_clear_groups"):
+            st.warning("⚠️ 確定要清除所有關鍵字組嗎？")
+            col_yes, col_no = st.columns(2)
+            with col_yes:
+                if st.button("確認清除", key="confirm_clear_groups_yes"):
+                    with get_project_data_lock():
+                        project_data = load_project_data(active_project["id"])
+                        save_project_data(active_project["id"], {**project_data, "keyword_groups": {}})
+                    del st.session_state["confirm_clear_groups"]
+                    st.success("✅ 已清除所有關鍵字組")
+                    st.rerun()
+            with col_no:
+                st.button("取消", key="confirm_clear_groups_no", on_click=st.session_state.pop, args=("confirm_clear_groups", None))
+
+    st.markdown("---")
+
+    st.markdown("#### 📊 專案資訊")
+
+    st.markdown(project_info_markdown(active_project["id"], active_project.get("updated"), active_project))
+
+
+# ============ 搜尋引擎類別 ============
+
+# 調試日誌只保留最近的行數，避免長時間運行的會話無限增長
+DEBUG_LOG_MAX_LINES = 500
+
+# 進度顯示最短更新間隔（秒），避免每個請求完成都推送一次前端更新
+PROGRESS_UPDATE_INTERVAL = 0.05
+
+# 批次請求在單個請求的超時之上，每項額外放寬的秒數
+BATCH_TIMEOUT_PER_QUERY = 2
+
+
+def get_retry_delay(retry_after, attempt, base=1.0, cap=60.0):
+    """計算重試等待秒數：優先遵從 Retry-After（秒數或 HTTP 日期），否則使用帶抖動的指數退避"""
+    if retry_after:
+        try:
+            return min(cap, max(0.0, float(retry_after)))
+        except ValueError:
+            try:
+                return min(cap, max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time()))
+            except (TypeError, ValueError):
+                pass
+    return min(cap, base * 2 ** attempt * random.uniform(0.5, 1.5))
+
+
+# 目前執行緒的重試日誌回調；Session 跨搜尋器及會話共用，無法把搜尋器綁定在 Retry 上
+retry_log_context = threading.local()
+
+
+class JitteredRetry(Retry):
+    """urllib3 重試策略：等待時間沿用 get_retry_delay（遵從 Retry-After、帶抖動、上限 60 秒）"""
+
+    def sleep(self, response=None):
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        wait_time = round(get_retry_delay(retry_after, max(0, len(self.history) - 1), base=2), 1)
+        callback = getattr(retry_log_context, "callback", None)
+        if callback:
+            callback(response.status if response is not None else None, wait_time)
+        time.sleep(wait_time)
+
+
+def parse_organic_results(data, page):
+    """只保留 organic 結果中用到的欄位（其餘如知識圖譜、相關問題不再保留），並加上實際排名及頁次"""
+    offset = (page - 1) * 10
+    return [
+        {
+            "title": result.get("title"),
+            "link": result.get("link", ""),
+            "snippet": result.get("snippet", ""),
+            "position": result.get("position", 0),
+            "actual_rank": offset + result.get("position", 0),
+            "page": page
+        }
+        for result in data.get("organic", [])
+    ]
+
+
+def flatten_page_buckets(all_results):
+    """將每個關鍵字按頁分桶的結果就地攤平為單一列表（未取得的頁為 None 或空列表）"""
+    # 按頁次序攤平；serper 每頁結果已按 position 排序，無需再排序
+    for keyword, pages in all_results.items():
+        all_results[keyword] = [r for page_results in pages if page_results for r in page_results]
+
+
+@st.cache_resource
+def get_event_loop_thread():
+    """在背景 daemon 執行緒上運行的事件迴圈，跨搜尋及重跑共用（有 uvloop 時優先使用）"""
+    loop = uvloop.new_event_loop() if uvloop else asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, name="serp-event-loop", daemon=True).start()
+    return loop
+
+
+async def _create_aiohttp_session(max_concurrent):
+    connector = aiohttp.TCPConnector(limit=max_concurrent, limit_per_host=max_concurrent,
+                                     ttl_dns_cache=600, keepalive_timeout=75)
+    timeout = aiohttp.ClientTimeout(total=30, connect=10)
+    return aiohttp.ClientSession(connector=connector, timeout=timeout)
+
+
+@st.cache_resource
+def get_aiohttp_session(max_concurrent):
+    """共用的 aiohttp 連線池（保留 keep-alive 連線、DNS 及 TLS 會話）"""
+    loop = get_event_loop_thread()
+    session = asyncio.run_coroutine_threadsafe(_create_aiohttp_session(max_concurrent), loop).result()
+    atexit.register(lambda: asyncio.run_coroutine_threadsafe(session.close(), loop).result(timeout=5))
+    return session
+
+
+@st.cache_resource
+def get_requests_session(pool_size, max_retries=3):
+    """共用的 requests Session（按連線池大小及重試次數快取），跨搜尋及重跑保留 keep-alive 連線"""
+    session = requests.Session()
+    # 限流及伺服器錯誤由 urllib3 在連線層重試，等待時間由 JitteredRetry 計算
+    retry = JitteredRetry(
+        total=max_retries,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset(["POST"]),
+        respect_retry_after_header=True,
+        raise_on_status=False
+    )
+    adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session.mount('https://', adapter)
+    return session
+
 
 class StableSerpSearcher:
     """穩定版 SERP 搜尋器"""
 
     def __init__(self, api_key, region="hk", lang="zh-tw", max_concurrent=10,
-                 delay_between_requests=0.1, max_retries=3, autocorrect=False):
+                 delay_between_requests=0.1, max_retries=3, autocorrect=False, batch_size=20):
         self.api_key = api_key
         self.region = region
         self.lang = lang
@@ -725,44 +1653,115 @@ class StableSerpSearcher:
         self.delay = delay_between_requests
         self.max_retries = max_retries
         self.autocorrect = autocorrect
-        self.debug_logs = []
+        self.batch_size = batch_size
+        self.debug_logs = deque(maxlen=DEBUG_LOG_MAX_LINES)
         self.success_count = 0
         self.fail_count = 0
+        self._completed = 0
+        self._total_tasks = 0
+        self._progress_callback = None
+        self._url = "https://google.serper.dev/search"
+        self._headers = {"X-API-KEY": api_key, "Content-Type": "application/json"}
+        self._base_payload = {"gl": region, "hl": lang, "num": 10, "autocorrect": autocorrect}
 
     def log(self, message):
         timestamp = datetime.now().strftime("%H:%M:%S.%f")[:-3]
         log_entry = f"[{timestamp}] {message}"
         self.debug_logs.append(log_entry)
 
-    async def _fetch_with_retry(self, session, keyword, page, semaphore):
+    def _build_payload(self, keyword, page):
+        return {**self._base_payload, "q": keyword, "page": page}
+
+    async def _post_batch(self, session, chunk, semaphore):
+        """以 Serper 批次請求（JSON 陣列）一次查詢多個 (關鍵字, 頁)，回傳 (數據, 是否因限流失敗)，失敗時數據為 None"""
         async with semaphore:
             await asyncio.sleep(random.uniform(0.05, self.delay))
 
-            url = "https://google.serper.dev/search"
-            payload = {
-                "q": keyword,
-                "gl": self.region,
-                "hl": self.lang,
-                "num": 10,
-                "page": page,
-                "autocorrect": self.autocorrect
-            }
-            headers = {
-                "X-API-KEY": self.api_key,
-                "Content-Type": "application/json"
-            }
+            payload = [self._build_payload(kw, page) for kw, page in chunk]
+            # 連線池預設的 30 秒總超時按單個請求設定，批次按項數放寬
+            timeout = aiohttp.ClientTimeout(total=30 + BATCH_TIMEOUT_PER_QUERY * len(chunk), connect=10)
+            rate_limited = False
 
             for attempt in range(self.max_retries):
+                rate_limited = False
                 try:
-                    async with session.post(url, json=payload, headers=headers) as response:
+                    async with session.post(self._url, json=payload, headers=self._headers,
+                                            timeout=timeout) as response:
                         if response.status == 200:
-                            data = await response.json()
-                            results = data.get("organic", [])
+                            data = from_json_bytes(await response.read())
+                            if isinstance(data, list) and len(data) == len(chunk):
+                                return data, False
+                            self.log(f"❌ 批次 ({len(chunk)} 項): 回應格式不符")
+                            return None, False
+
+                        elif response.status == 429:
+                            rate_limited = True
+                            if attempt < self.max_retries - 1:
+                                wait_time = round(get_retry_delay(response.headers.get("Retry-After"), attempt, base=2), 1)
+                                self.log(f"⚠️ 批次 ({len(chunk)} 項): 限流，等待 {wait_time}s")
+                                await asyncio.sleep(wait_time)
+                            continue
+
+                        else:
+                            self.log(f"❌ 批次 ({len(chunk)} 項): HTTP {response.status}")
+                            if attempt < self.max_retries - 1:
+                                await asyncio.sleep(1)
+                                continue
+
+                except asyncio.TimeoutError:
+                    self.log(f"⏱️ 批次 ({len(chunk)} 項): 超時")
+                    if attempt < self.max_retries - 1:
+                        await asyncio.sleep(1)
+                        continue
+
+                except Exception as e:
+                    self.log(f"❌ 批次 ({len(chunk)} 項): {str(e)[:50]}")
+                    if attempt < self.max_retries - 1:
+                        await asyncio.sleep(1)
+                        continue
+
+            return None, rate_limited
+
+    async def _fetch_batch(self, session, chunk, semaphore):
+        data, rate_limited = await self._post_batch(session, chunk, semaphore)
+
+        if rate_limited:
+            # 限流時改為逐個請求只會把請求數放大到批次項數倍，整批記為失敗
+            self.log(f"❌ 批次 ({len(chunk)} 項): 限流，已重試 {self.max_retries} 次")
+            self.fail_count += len(chunk)
+            batch_results = [{"keyword": kw, "page": page, "results": [], "success": False} for kw, page in chunk]
+        elif data is None:
+            # 回應格式不符或其他錯誤時改為逐個請求，保留每個請求各自的重試
+            self.log(f"↩️ 批次 ({len(chunk)} 項) 改為逐個請求")
+            batch_results = await asyncio.gather(*(
+                self._fetch_with_retry(session, kw, page, semaphore) for kw, page in chunk
+            ))
+        else:
+            batch_results = []
+            for (keyword, page), item in zip(chunk, data):
+                results = parse_organic_results(item, page)
+                self.success_count += 1
+                self.log(f"✅ {keyword} (頁{page}): 取得 {len(results)} 個結果")
+                batch_results.append({"keyword": keyword, "page": page, "results": results, "success": True})
+
+        self._completed += len(batch_results)
+        if self._progress_callback:
+            self._progress_callback(self._completed, self._total_tasks, chunk[-1][0])
+
+        return batch_results
+
+    async def _fetch_with_retry(self, session, keyword, page, semaphore):
+        async with semaphore:
+            await asyncio.sleep(random.uniform(0.05, self.delay))
+
+            payload = self._build_payload(keyword, page)
 
-                            for result in results:
-                                original_position = result.get("position", 0)
-                                result["actual_rank"] = (page - 1) * 10 + original_position
-                                result["page"] = page
+            for attempt in range(self.max_retries):
+                try:
+                    async with session.post(self._url, json=payload, headers=self._headers) as response:
+                        if response.status == 200:
+                            data = from_json_bytes(await response.read())
+                            results = parse_organic_results(data, page)
 
                             self.success_count += 1
                             self.log(f"✅ {keyword} (頁{page}): 取得 {len(results)} 個結果")
@@ -775,7 +1774,7 @@ class StableSerpSearcher:
                             }
 
                         elif response.status == 429:
-                            wait_time = (attempt + 1) * 2
+                            wait_time = round(get_retry_delay(response.headers.get("Retry-After"), attempt, base=2), 1)
                             self.log(f"⚠️ {keyword} (頁{page}): 限流，等待 {wait_time}s")
                             await asyncio.sleep(wait_time)
                             continue
@@ -801,8 +1800,8 @@ class StableSerpSearcher:
             self.fail_count += 1
             return {"keyword": keyword, "page": page, "results": [], "success": False}
 
-    async def search_all_async(self, keywords, max_pages, progress_callback=None):
-        self.debug_logs = []
+    async def search_all_async(self, session, keywords, max_pages, progress_callback=None):
+        self.debug_logs.clear()
         self.success_count = 0
         self.fail_count = 0
 
@@ -813,127 +1812,146 @@ class StableSerpSearcher:
         self.log(f"📝 Autocorrect: {'開啟' if self.autocorrect else '關閉'}")
 
         semaphore = asyncio.Semaphore(self.max_concurrent)
-        connector = aiohttp.TCPConnector(limit=self.max_concurrent, ttl_dns_cache=300)
-        timeout = aiohttp.ClientTimeout(total=30, connect=10)
-
-        all_results = {kw: [] for kw in keywords}
-        completed = 0
 
-        async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
-            coroutines = [
-                self._fetch_with_retry(session, kw, page, semaphore)
-                for kw, page in tasks_info
-            ]
+        all_results = {kw: [None] * max_pages for kw in keywords}
+        self._completed = 0
+        self._total_tasks = total_tasks
+        self._progress_callback = progress_callback
 
-            for coro in asyncio.as_completed(coroutines):
-                result = await coro
-                completed += 1
+        batches = await asyncio.gather(*(
+            self._fetch_batch(session, tasks_info[i:i + self.batch_size], semaphore)
+            for i in range(0, total_tasks, self.batch_size)
+        ))
 
-                keyword = result["keyword"]
+        for batch_results in batches:
+            for result in batch_results:
                 if result["success"] and result["results"]:
-                    all_results[keyword].extend(result["results"])
-
-                if progress_callback:
-                    progress_callback(completed, total_tasks, keyword)
+                    all_results[result["keyword"]][result["page"] - 1] = result["results"]
 
-        for keyword in all_results:
-            all_results[keyword].sort(key=lambda x: x.get("actual_rank", 999))
+        flatten_page_buckets(all_results)
 
         self.log(f"📊 完成: 成功={self.success_count}, 失敗={self.fail_count}")
         return all_results
 
     def search_all(self, keywords, max_pages, progress_callback=None):
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        try:
-            return loop.run_until_complete(
-                self.search_all_async(keywords, max_pages, progress_callback)
-            )
-        finally:
-            loop.close()
+        session = get_aiohttp_session(self.max_concurrent)
+        progress_queue = queue.SimpleQueue()
+
+        future = asyncio.run_coroutine_threadsafe(
+            self.search_all_async(session, keywords, max_pages, lambda *args: progress_queue.put(args)),
+            get_event_loop_thread()
+        )
+
+        # 進度回調會更新 Streamlit 元件，必須在腳本執行緒中調用；每次只顯示佇列中最新的進度
+        while True:
+            finished = future.done()
+
+            progress = None
+            while not progress_queue.empty():
+                progress = progress_queue.get_nowait()
+            if progress and progress_callback:
+                progress_callback(*progress)
+
+            if finished:
+                return future.result()
+            time.sleep(0.1)
 
 
 class SequentialSerpSearcher:
     """順序搜尋器"""
 
-    def __init__(self, api_key, region="hk", lang="zh-tw", delay=0.3, autocorrect=False):
+    def __init__(self, api_key, region="hk", lang="zh-tw", delay=0.3, autocorrect=False, max_retries=3,
+                 max_workers=5):
         self.api_key = api_key
         self.region = region
         self.lang = lang
         self.delay = delay
         self.autocorrect = autocorrect
-        self.debug_logs = []
+        self.max_retries = max_retries
+        self.max_workers = max_workers
+        self.debug_logs = deque(maxlen=DEBUG_LOG_MAX_LINES)
         self.success_count = 0
         self.fail_count = 0
+        self._count_lock = threading.Lock()
 
-        self.session = requests.Session()
-        adapter = requests.adapters.HTTPAdapter(pool_connections=5, pool_maxsize=5, max_retries=3)
-        self.session.mount('https://', adapter)
+        self.session = get_requests_session(max_workers, max_retries)
+        self._url = "https://google.serper.dev/search"
+        self._headers = {"X-API-KEY": api_key, "Content-Type": "application/json"}
+        self._base_payload = {"gl": region, "hl": lang, "num": 10, "autocorrect": autocorrect}
 
     def log(self, message):
         timestamp = datetime.now().strftime("%H:%M:%S.%f")[:-3]
         self.debug_logs.append(f"[{timestamp}] {message}")
 
+    def _log_retry(self, keyword, page, status, wait_time):
+        if status == 429:
+            reason = "限流"
+        elif status:
+            reason = f"HTTP {status}"
+        else:
+            reason = "連線錯誤"
+        self.log(f"⚠️ {keyword} (頁{page}): {reason}，等待 {wait_time}s")
+
     def _fetch_single(self, keyword, page):
-        url = "https://google.serper.dev/search"
-        payload = {
-            "q": keyword,
-            "gl": self.region,
-            "hl": self.lang,
-            "num": 10,
-            "page": page,
-            "autocorrect": self.autocorrect
-        }
-        headers = {"X-API-KEY": self.api_key, "Content-Type": "application/json"}
+        payload = {**self._base_payload, "q": keyword, "page": page}
 
+        # 重試由 Session 的 urllib3 Retry 處理，每次等待經回調寫入日誌，這裡只看最終回應
+        retry_log_context.callback = lambda status, wait_time: self._log_retry(keyword, page, status, wait_time)
         try:
-            response = self.session.post(url, json=payload, headers=headers, timeout=15)
+            response = self.session.post(self._url, json=payload, headers=self._headers, timeout=15)
 
             if response.status_code == 200:
-                data = response.json()
-                results = data.get("organic", [])
-
-                for result in results:
-                    result["actual_rank"] = (page - 1) * 10 + result.get("position", 0)
-                    result["page"] = page
+                results = parse_organic_results(from_json_bytes(response.content), page)
 
-                self.success_count += 1
+                with self._count_lock:
+                    self.success_count += 1
                 self.log(f"✅ {keyword} (頁{page}): {len(results)} 結果")
                 return results
 
             elif response.status_code == 429:
-                self.log(f"⚠️ {keyword} (頁{page}): 限流")
-                time.sleep(2)
-                return self._fetch_single(keyword, page)
+                self.log(f"❌ {keyword} (頁{page}): 限流，已重試 {self.max_retries} 次")
             else:
                 self.log(f"❌ {keyword} (頁{page}): HTTP {response.status_code}")
-                self.fail_count += 1
 
         except Exception as e:
             self.log(f"❌ {keyword} (頁{page}): {str(e)[:30]}")
-            self.fail_count += 1
+        finally:
+            retry_log_context.callback = None
 
+        with self._count_lock:
+            self.fail_count += 1
         return []
 
+    def _fetch_paced(self, keyword, page):
+        results = self._fetch_single(keyword, page)
+        time.sleep(self.delay)
+        return results
+
     def search_all(self, keywords, max_pages, progress_callback=None):
-        self.debug_logs = []
+        self.debug_logs.clear()
         self.success_count = 0
         self.fail_count = 0
 
-        total = len(keywords) * max_pages
+        all_results = {kw: [None] * max_pages for kw in keywords}
+        total = len(all_results) * max_pages
         completed = 0
-        all_results = {}
 
-        for keyword in keywords:
-            all_results[keyword] = []
-            for page in range(1, max_pages + 1):
-                results = self._fetch_single(keyword, page)
-                all_results[keyword].extend(results)
+        # requests 在網絡 I/O 期間釋放 GIL，多執行緒可共用 Session 的連線池
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {
+                executor.submit(self._fetch_paced, keyword, page): (keyword, page)
+                for keyword in all_results for page in range(1, max_pages + 1)
+            }
+
+            for future in as_completed(futures):
+                # 取出後即釋放 future，已完成的回應不再被保留至整次搜尋結束
+                keyword, page = futures.pop(future)
+                all_results[keyword][page - 1] = future.result()
                 completed += 1
                 if progress_callback:
                     progress_callback(completed, total, keyword)
-                time.sleep(self.delay)
-            all_results[keyword].sort(key=lambda x: x.get("actual_rank", 999))
+
+        flatten_page_buckets(all_results)
 
         return all_results
 
@@ -942,7 +1960,7 @@ class BatchSerpSearcher:
     """批次搜尋器"""
 
     def __init__(self, api_key, region="hk", lang="zh-tw",
-                 batch_size=5, delay_between_batches=1.0, max_workers=5, autocorrect=False):
+                 batch_size=5, delay_between_batches=1.0, max_workers=5, autocorrect=False, max_retries=5):
         self.api_key = api_key
         self.region = region
         self.lang = lang
@@ -950,80 +1968,103 @@ class BatchSerpSearcher:
         self.batch_delay = delay_between_batches
         self.max_workers = max_workers
         self.autocorrect = autocorrect
-        self.debug_logs = []
+        self.max_retries = max_retries
+        self.debug_logs = deque(maxlen=DEBUG_LOG_MAX_LINES)
         self.success_count = 0
         self.fail_count = 0
 
-        self.session = requests.Session()
-        adapter = requests.adapters.HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers, max_retries=3)
-        self.session.mount('https://', adapter)
+        self.session = get_requests_session(max_workers, max_retries)
+        self._url = "https://google.serper.dev/search"
+        self._headers = {"X-API-KEY": api_key, "Content-Type": "application/json"}
+        self._base_payload = {"gl": region, "hl": lang, "num": 10, "autocorrect": autocorrect}
 
     def log(self, message):
         timestamp = datetime.now().strftime("%H:%M:%S.%f")[:-3]
         self.debug_logs.append(f"[{timestamp}] {message}")
 
     def _fetch_single(self, keyword, page):
-        url = "https://google.serper.dev/search"
-        payload = {
-            "q": keyword,
-            "gl": self.region,
-            "hl": self.lang,
-            "num": 10,
-            "page": page,
-            "autocorrect": self.autocorrect
-        }
-        headers = {"X-API-KEY": self.api_key, "Content-Type": "application/json"}
+        payload = {**self._base_payload, "q": keyword, "page": page}
+        started_at = time.monotonic()
 
-        for attempt in range(3):
-            try:
-                response = self.session.post(url, json=payload, headers=headers, timeout=15)
-                if response.status_code == 200:
-                    data = response.json()
-                    results = data.get("organic", [])
-                    for result in results:
-                        result["actual_rank"] = (page - 1) * 10 + result.get("position", 0)
-                        result["page"] = page
-                    self.success_count += 1
-                    return {"keyword": keyword, "page": page, "results": results, "success": True}
-                elif response.status_code == 429:
-                    time.sleep((attempt + 1) * 2)
-                    continue
-            except Exception:
-                if attempt < 2:
-                    time.sleep(1)
-                    continue
-
-        self.fail_count += 1
-        return {"keyword": keyword, "page": page, "results": [], "success": False}
+        # 限流及 5xx 的重試與退避由 Session 的 urllib3 Retry 處理
+        try:
+            response = self.session.post(self._url, json=payload, headers=self._headers, timeout=15)
+            if response.status_code == 200:
+                results = parse_organic_results(from_json_bytes(response.content), page)
+                # 經過重試的耗時包含退避等待，不能反映正常延遲，不回報給自適應並發
+                retries = getattr(response.raw, "retries", None)
+                elapsed = None if retries and retries.history else time.monotonic() - started_at
+                return {"keyword": keyword, "page": page, "results": results, "success": True,
+                        "elapsed": elapsed}
+        except Exception:
+            pass
+
+        return {"keyword": keyword, "page": page, "results": [], "success": False, "elapsed": None}
 
     def search_all(self, keywords, max_pages, progress_callback=None):
-        self.debug_logs = []
+        self.debug_logs.clear()
         self.success_count = 0
         self.fail_count = 0
 
         all_tasks = [(kw, page) for kw in keywords for page in range(1, max_pages + 1)]
         total_tasks = len(all_tasks)
-        batches = [all_tasks[i:i + self.batch_size] for i in range(0, len(all_tasks), self.batch_size)]
+        pending_tasks = iter(all_tasks)
 
-        all_results = {kw: [] for kw in keywords}
+        all_results = {kw: [None] * max_pages for kw in keywords}
         completed = 0
 
-        for batch_idx, batch in enumerate(batches):
-            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-                futures = {executor.submit(self._fetch_single, kw, page): (kw, page) for kw, page in batch}
-                for future in as_completed(futures):
-                    result = future.result()
-                    completed += 1
-                    if result["success"]:
-                        all_results[result["keyword"]].extend(result["results"])
-                    if progress_callback:
-                        progress_callback(completed, total_tasks, result["keyword"])
+        # 每 batch_delay 秒最多發出 batch_size 個請求，以固定間隔平均分佈，不再在批次邊界等待
+        submit_interval = self.batch_delay / self.batch_size if self.batch_size else 0
+        next_submit_at = time.monotonic()
+
+        # 完成的任務由 done callback 放入佇列，按完成順序取出
+        done_queue = queue.SimpleQueue()
+
+        # 進行中的請求數按 Little's law 自適應：發送速率 × 平均延遲（EWMA，只計未經重試的成功請求），上限 max_workers
+        target_in_flight = self.max_workers
+        latency_ewma = None
+
+        # 整次搜尋共用同一個執行緒池，任務完成即補上下一個
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            in_flight = 0
+
+            while True:
+                while in_flight < target_in_flight:
+                    task = next(pending_tasks, None)
+                    if task is None:
+                        break
+                    wait_time = next_submit_at - time.monotonic()
+                    if wait_time > 0:
+                        time.sleep(wait_time)
+                    next_submit_at = max(next_submit_at, time.monotonic()) + submit_interval
+                    executor.submit(self._fetch_single, *task).add_done_callback(done_queue.put)
+                    in_flight += 1
+
+                if not in_flight:
+                    break
+
+                result = done_queue.get().result()
+                in_flight -= 1
+                completed += 1
+
+                if result["elapsed"] is not None:
+                    if latency_ewma is None:
+                        latency_ewma = result["elapsed"]
+                    else:
+                        latency_ewma = 0.7 * latency_ewma + 0.3 * result["elapsed"]
+                    if submit_interval > 0:
+                        target_in_flight = max(1, min(self.max_workers, int(latency_ewma / submit_interval) + 1))
 
-            if batch_idx < len(batches) - 1:
-                time.sleep(self.batch_delay)
+                # 計數只在主執行緒更新，工作執行緒不共享可變狀態
+                if result["success"]:
+                    self.success_count += 1
+                    all_results[result["keyword"]][result["page"] - 1] = result["results"]
+                else:
+                    self.fail_count += 1
+                if progress_callback:
+                    progress_callback(completed, total_tasks, result["keyword"])
 
-        for keyword in all_results:
-            all_results[keyword].sort(key=lambda x: x.get("actual_rank", 999))
+        flatten_page_buckets(all_results)
 
         return all_results
 
@@ -1033,20 +2074,26 @@ class BatchSerpSearcher:
 def find_rankings(serp_results, sites):
     """從 SERP 結果中找出指定網站的排名"""
     rankings = []
+    sites_normalized = [(site, normalize_domain(site)) for site in sites]
 
     for keyword, results in serp_results.items():
-        row = {"keyword": keyword}
+        # 每個關鍵字的結果連結只標準化一次，供所有網站比對；完整連結不經 normalize_domain 的快取，以免擠掉網域
+        links = [(normalize_link(result.get("link", "")), result.get("actual_rank")) for result in results]
 
-        for site in sites:
-            rank = None
-            site_normalized = normalize_domain(site)
-            for result in results:
-                link = result.get("link", "")
-                link_normalized = normalize_domain(link)
-                if site_normalized in link_normalized:
-                    rank = result.get("actual_rank")
-                    break
-            row[site] = rank
+        # 「網域 → 首個排名」索引：子網域同時登記其各級上層網域，網站比對只需一次字典查找
+        host_ranks = {}
+        for link, rank in links:
+            labels = link.partition("/")[0].split(".")
+            for i in range(len(labels) - 1):
+                host_ranks.setdefault(".".join(labels[i:]), rank)
+
+        row = {"keyword": keyword}
+        for site, site_normalized in sites_normalized:
+            if "/" in site_normalized:
+                # 帶路徑的網站（如 example.com/blog）仍按子字串逐個比對連結
+                row[site] = next((rank for link, rank in links if site_normalized in link), None)
+            else:
+                row[site] = host_ranks.get(site_normalized)
 
         rankings.append(row)
 
@@ -1055,14 +2102,17 @@ def find_rankings(serp_results, sites):
 
 # ============ 初始化 Session State ============
 
-if "projects_data" not in st.session_state:
+# 專案列表檔案有變更（包括其他會話寫入）時才重新載入
+projects_signature = get_file_signature(PROJECTS_FILE)
+if "projects_data" not in st.session_state or st.session_state.get("projects_signature") != projects_signature:
     st.session_state.projects_data = load_projects()
+    st.session_state.projects_signature = projects_signature
 
 if "current_results" not in st.session_state:
     st.session_state.current_results = None
 
 if "debug_logs" not in st.session_state:
-    st.session_state.debug_logs = []
+    st.session_state.debug_logs = deque(maxlen=DEBUG_LOG_MAX_LINES)
 
 if "current_tab" not in st.session_state:
     st.session_state.current_tab = 0
@@ -1086,8 +2136,6 @@ st.markdown("""
 
 # ============ 專案選擇器（頂部） ============
 
-projects_data = load_projects()
-
 if projects_data["projects"]:
     col_project, col_btn = st.columns([4, 1])
 
@@ -1126,8 +2174,9 @@ if projects_data["projects"]:
     active_project = get_active_project()
 
     if active_project:
-        project_data = load_project_data(active_project["id"])
-        record_count = len(project_data.get("records", []))
+        # 本次重跑只載入一次活躍專案數據，專案管理及主功能區共用
+        active_project_data = load_project_data(active_project["id"])
+        record_count = len(active_project_data.get("records", []))
 
         st.markdown(f"""
         <div class="project-header">
@@ -1209,7 +2258,7 @@ if st.session_state.show_project_manager:
     with tab_list:
         st.markdown("### 所有專案")
 
-        projects = load_projects()["projects"]
+        projects = projects_data["projects"]
 
         if not projects:
             st.info("還沒有任何專案")
@@ -1317,6 +2366,7 @@ if st.session_state.show_project_manager:
 
         with col1:
             st.markdown("#### 📥 匯出")
+            export_date = datetime.now().strftime("%Y%m%d")
 
             if projects_data["projects"]:
                 export_data = {
@@ -1326,11 +2376,15 @@ if st.session_state.show_project_manager:
                 for project in projects_data["projects"]:
                     export_data["project_data"][project["id"]] = load_project_data(project["id"])
 
-                json_export = json.dumps(export_data, ensure_ascii=False, indent=2)
+                json_export = export_all_projects_json(
+                    projects_signature,
+                    tuple(get_project_file_signature(project["id"]) for project in projects_data["projects"]),
+                    export_data
+                )
                 st.download_button(
                     label="📥 匯出所有專案",
                     data=json_export,
-                    file_name=f"seo_projects_backup_{datetime.now().strftime('%Y%m%d')}.json",
+                    file_name=f"seo_projects_backup_{export_date}.json",
                     mime="application/json",
                     use_container_width=True
                 )
@@ -1338,13 +2392,18 @@ if st.session_state.show_project_manager:
                 if active_project:
                     single_export = {
                         "project": active_project,
-                        "data": load_project_data(active_project["id"])
+                        "data": active_project_data
                     }
-                    json_single = json.dumps(single_export, ensure_ascii=False, indent=2)
+                    json_single = export_project_json(
+                        active_project["id"],
+                        active_project.get("updated"),
+                        get_project_file_signature(active_project["id"]),
+                        single_export
+                    )
                     st.download_button(
                         label=f"📥 只匯出「{active_project['name']}」",
                         data=json_single,
-                        file_name=f"seo_project_{active_project['name']}_{datetime.now().strftime('%Y%m%d')}.json",
+                        file_name=f"seo_project_{active_project['name']}_{export_date}.json",
                         mime="application/json",
                         use_container_width=True
                     )
@@ -1354,39 +2413,27 @@ if st.session_state.show_project_manager:
 
             uploaded_file = st.file_uploader("上傳專案備份 JSON", type=["json"], key="import_projects")
 
+            # 匯入在按鈕回調中完成，本次執行已經是更新後的專案列表，無需再 st.rerun()
+            if st.session_state.pop("import_succeeded", False):
+                st.success("✅ 匯入成功！")
+            import_error = st.session_state.pop("import_error", None)
+            if import_error:
+                st.error(f"匯入失敗：{import_error}")
+
             if uploaded_file:
                 try:
-                    imported = json.load(uploaded_file)
+                    imported = parse_uploaded_json(uploaded_file.file_id, uploaded_file.getvalue())
 
                     if "projects" in imported:
                         st.info(f"檢測到 {len(imported['projects'])} 個專案")
-                        if st.button("確認匯入所有專案", type="primary"):
-                            for project in imported["projects"]:
-                                existing_ids = [p["id"] for p in projects_data["projects"]]
-                                if project["id"] not in existing_ids:
-                                    projects_data["projects"].append(project)
-                                    if project["id"] in imported.get("project_data", {}):
-                                        save_project_data(project["id"], imported["project_data"][project["id"]])
-
-                            save_projects(projects_data)
-                            st.session_state.projects_data = load_projects()
-                            st.success("✅ 匯入成功！")
-                            st.rerun()
+                        st.button("確認匯入所有專案", type="primary",
+                                  on_click=import_projects_backup, args=(imported,))
 
                     elif "project" in imported:
                         project = imported["project"]
                         st.info(f"檢測到專案：{project['name']}")
-                        if st.button("確認匯入此專案", type="primary"):
-                            new_id = f"proj_{datetime.now().strftime('%Y%m%d%H%M%S')}_{random.randint(1000, 9999)}"
-                            project["id"] = new_id
-
-                            projects_data["projects"].append(project)
-                            save_projects(projects_data)
-                            save_project_data(new_id, imported.get("data", {}))
-
-                            st.session_state.projects_data = load_projects()
-                            st.success("✅ 匯入成功！")
-                            st.rerun()
+                        st.button("確認匯入此專案", type="primary",
+                                  on_click=import_project_backup, args=(imported,))
 
                 except Exception as e:
                     st.error(f"匯入失敗：{e}")
@@ -1396,7 +2443,7 @@ if st.session_state.show_project_manager:
 # ============ 主功能區（需要有活躍專案）============
 
 if active_project:
-    current_project_data = load_project_data(active_project["id"])
+    current_project_data = active_project_data
 
     # ============ 側邊欄設定 ============
 
@@ -1543,7 +2590,8 @@ if active_project:
                 key="keywords_text_area"
             )
             st.session_state["keywords_input"] = keywords_input
-            keywords = [k.strip() for k in keywords_input.split("\n") if k.strip()]
+            # 重複的關鍵字只查詢一次（保留首次出現的順序）
+            keywords = list(dict.fromkeys(k.strip() for k in keywords_input.split("\n") if k.strip()))
 
         with col_right:
             st.markdown("### 📂 關鍵字組（點擊複製）")
@@ -1611,8 +2659,14 @@ if active_project:
                     stats_display = st.empty()
 
             start_time = time.time()
+            last_progress_update = [0.0]
 
             def update_progress(completed, total, current_keyword):
+                now = time.monotonic()
+                if completed < total and now - last_progress_update[0] < PROGRESS_UPDATE_INTERVAL:
+                    return
+                last_progress_update[0] = now
+
                 progress = completed / total
                 progress_bar.progress(progress)
                 elapsed = time.time() - start_time
@@ -1621,7 +2675,8 @@ if active_project:
                 stats_display.markdown(f"**{completed}/{total}**")
 
             if speed_mode == "stable":
-                searcher = SequentialSerpSearcher(api_key, search_region, search_lang, delay, autocorrect_enabled)
+                searcher = SequentialSerpSearcher(api_key, search_region, search_lang, delay, autocorrect_enabled,
+                                                  max_workers=max_concurrent)
             elif speed_mode == "balanced":
                 searcher = BatchSerpSearcher(api_key, search_region, search_lang, max_concurrent, 0.5, max_concurrent,
                                              autocorrect_enabled)
@@ -1632,11 +2687,11 @@ if active_project:
             serp_results = searcher.search_all(keywords, max_pages, update_progress)
             elapsed_time = time.time() - start_time
 
-            st.session_state.debug_logs = searcher.debug_logs
+            st.session_state.debug_logs = deque(searcher.debug_logs, maxlen=DEBUG_LOG_MAX_LINES)
 
             if debug_mode and searcher.debug_logs:
                 with st.expander("🐛 調試日誌", expanded=True):
-                    log_text = "\n".join(searcher.debug_logs[-50:])
+                    log_text = "\n".join(islice(searcher.debug_logs, max(0, len(searcher.debug_logs) - 50), None))
                     st.markdown(f'<div class="debug-box">{log_text}</div>', unsafe_allow_html=True)
 
             all_rankings = find_rankings(serp_results, all_sites)
@@ -1660,7 +2715,8 @@ if active_project:
                 "success_rate": success_rate,
                 "my_sites": my_sites,
                 "competitors": competitors,
-                "keywords": keywords
+                "keywords": keywords,
+                "keyword_order_map": {kw: idx for idx, kw in enumerate(keywords)}
             }
 
             record = {
@@ -1683,14 +2739,16 @@ if active_project:
             result_my_sites = results.get("my_sites", my_sites)
             result_competitors = results.get("competitors", competitors)
             result_keywords = results.get("keywords", [])
-            keyword_order_map = {kw: idx for idx, kw in enumerate(result_keywords)}
+            keyword_order_map = results.get("keyword_order_map")
+            if keyword_order_map is None:
+                keyword_order_map = {kw: idx for idx, kw in enumerate(result_keywords)}
 
             history_records = current_project_data.get("records", [])
-            previous_rankings = {}
-            if len(history_records) >= 2:
-                prev_record = history_records[-2]
-                for item in prev_record.get("rankings", []):
-                    previous_rankings[item.get("keyword")] = item
+            prev_record = history_records[-2] if len(history_records) >= 2 else {}
+            previous_record_id = prev_record.get("id")
+            previous_rankings = {
+                item["keyword"]: item for item in prev_record.get("rankings", []) if item.get("keyword")
+            }
 
             st.markdown("## 📋 詳細排名")
 
@@ -1698,215 +2756,64 @@ if active_project:
             **圖例：** 🔵 我的網站（藍色系）| 🟠 競爭對手（橙色系）| ⚠️ 紅色 = 排名 > {warning_threshold} | N/A = 未上榜
             """)
 
-            df_display, styled_df = create_styled_ranking_dataframe(
-                rankings, result_my_sites, result_competitors, warning_threshold, previous_rankings
+            df_display, ranking_styles = get_ranking_tables(
+                active_project["id"], results.get("timestamp"), previous_record_id,
+                result_my_sites, result_competitors, warning_threshold, rankings, previous_rankings
             )
 
-            st.dataframe(styled_df, use_container_width=True, height=500)
-
-            def create_excel(rankings_data, serp_data, my_sites_list, competitors_list):
-                output = BytesIO()
-                with pd.ExcelWriter(output, engine="openpyxl") as writer:
-                    df_rankings = pd.DataFrame(rankings_data)
-                    df_rankings.to_excel(writer, sheet_name="排名總覽", index=False)
-
-                    serp_records = []
-                    for keyword, results_list in serp_data.items():
-                        for result in results_list:
-                            serp_records.append({
-                                "關鍵字": keyword,
-                                "排名": result.get("actual_rank"),
-                                "標題": result.get("title"),
-                                "網址": result.get("link"),
-                                "描述": result.get("snippet", "")[:200]
-                            })
-                    if serp_records:
-                        pd.DataFrame(serp_records).to_excel(writer, sheet_name="完整SERP", index=False)
-
-                output.seek(0)
-                return output
-
-            col_dl1, col_dl2 = st.columns(2)
-
-            with col_dl1:
-                excel_file = create_excel(rankings, results.get("serp_data", {}), result_my_sites, result_competitors)
-                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                st.download_button(
-                    label="📥 下載 Excel 報告",
-                    data=excel_file,
-                    file_name=f"{active_project['name']}_排名_{timestamp}.xlsx",
-                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                    use_container_width=True
-                )
+            display_ranking_table(df_display, ranking_styles, 500)
 
-            with col_dl2:
-                csv_data = df_display.to_csv(index=False).encode("utf-8-sig")
-                st.download_button(
-                    label="📥 下載 CSV",
-                    data=csv_data,
-                    file_name=f"{active_project['name']}_排名_{timestamp}.csv",
-                    mime="text/csv",
-                    use_container_width=True
-                )
+            # 下載檔案只在用戶要求後才生成，之後同一結果直接沿用快取
+            downloads_ready = st.session_state.get("downloads_ready_for") == results.get("timestamp")
+            if not downloads_ready and st.button("📦 準備下載檔案（Excel / CSV）", use_container_width=True):
+                st.session_state["downloads_ready_for"] = results.get("timestamp")
+                downloads_ready = True
+
+            if downloads_ready:
+                col_dl1, col_dl2 = st.columns(2)
+
+                with col_dl1:
+                    excel_file = export_results_excel(
+                        active_project["id"], results.get("timestamp"), rankings, results.get("serp_data", {})
+                    )
+                    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+                    st.download_button(
+                        label="📥 下載 Excel 報告",
+                        data=excel_file,
+                        file_name=f"{active_project['name']}_排名_{timestamp}.xlsx",
+                        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                        use_container_width=True
+                    )
+
+                with col_dl2:
+                    csv_data = export_results_csv(
+                        active_project["id"], results.get("timestamp"), previous_record_id, df_display
+                    )
+                    st.download_button(
+                        label="📥 下載 CSV",
+                        data=csv_data,
+                        file_name=f"{active_project['name']}_排名_{timestamp}.csv",
+                        mime="text/csv",
+                        use_container_width=True
+                    )
 
             # ============ 排名總覽（一行一個關鍵字樣式） ============
 
             st.markdown("---")
             st.markdown("## 📊 排名總覽")
 
+            site_details = get_sites_keywords_detail(
+                active_project["id"], results.get("timestamp"), tuple(result_my_sites + result_competitors),
+                warning_threshold, rankings, keyword_order_map
+            )
+
             if result_my_sites:
                 st.markdown("### 🏠 我的網站")
-
-                for site in result_my_sites:
-                    analysis = analyze_site_keywords_detail(rankings, site, warning_threshold, keyword_order_map)
-
-                    with st.expander(f"📊 **{site}**", expanded=True):
-                        cols = st.columns(6)
-
-                        categories = [
-                            ("🏆 前3名", "top3", "#10B981", len(analysis["top3"])),
-                            ("📄 首頁(4-10)", "top10", "#3B82F6", len(analysis["top10"])),
-                            ("📑 第2頁(11-20)", "top20", "#F59E0B", len(analysis["top20"])),
-                            ("📋 第3頁(21-30)", "top30", "#8B5CF6", len(analysis["top30"])),
-                            (f"⚠️ >{warning_threshold}名", "warning", "#EF4444", len(analysis["warning"])),
-                            ("❌ 未上榜", "na", "#6B7280", len(analysis["na"]))
-                        ]
-
-                        for i, (label, key, color, count) in enumerate(categories):
-                            with cols[i]:
-                                st.markdown(f"""
-                                <div style="text-align: center; padding: 0.5rem; background: white; border-radius: 8px; border-left: 3px solid {color};">
-                                    <div style="font-size: 1.5rem; font-weight: bold; color: {color};">{count}</div>
-                                    <div style="font-size: 0.75rem; color: #666;">{label}</div>
-                                </div>
-                                """, unsafe_allow_html=True)
-
-                        st.markdown("---")
-
-                        detail_tabs = st.tabs([
-                            f"🏆 前3名 ({len(analysis['top3'])})",
-                            f"📄 首頁 ({len(analysis['top10'])})",
-                            f"📑 第2頁 ({len(analysis['top20'])})",
-                            f"📋 第3頁 ({len(analysis['top30'])})",
-                            f"⚠️ 警告 ({len(analysis['warning'])})",
-                            f"❌ 未上榜 ({len(analysis['na'])})"
-                        ])
-
-                        with detail_tabs[0]:
-                            if analysis["top3"]:
-                                display_keyword_list(analysis["top3"], "rank-top3")
-                            else:
-                                st.info("沒有排在前3名的關鍵字")
-
-                        with detail_tabs[1]:
-                            if analysis["top10"]:
-                                display_keyword_list(analysis["top10"], "rank-top10")
-                            else:
-                                st.info("沒有排在4-10名的關鍵字")
-
-                        with detail_tabs[2]:
-                            if analysis["top20"]:
-                                display_keyword_list(analysis["top20"], "rank-top20")
-                            else:
-                                st.info("沒有排在11-20名的關鍵字")
-
-                        with detail_tabs[3]:
-                            if analysis["top30"]:
-                                display_keyword_list(analysis["top30"], "rank-top30")
-                            else:
-                                st.info("沒有排在21-30名的關鍵字")
-
-                        with detail_tabs[4]:
-                            if analysis["warning"]:
-                                st.warning(f"⚠️ 以下 {len(analysis['warning'])} 個關鍵字排名超過 {warning_threshold}：")
-                                display_keyword_list(analysis["warning"], "rank-warning")
-                            else:
-                                st.success("沒有需要警告的關鍵字！")
-
-                        with detail_tabs[5]:
-                            if analysis["na"]:
-                                display_keyword_list(analysis["na"], "rank-na", show_rank=False)
-                            else:
-                                st.success("所有關鍵字都有排名！")
+                render_site_overview(result_my_sites, site_details, warning_threshold, "mine")
 
             if result_competitors:
                 st.markdown("### 🎯 競爭對手")
-            
-                for site in result_competitors:
-                    analysis = analyze_site_keywords_detail(rankings, site, warning_threshold, keyword_order_map)
-            
-                    with st.expander(f"📊 **{site}**", expanded=False):
-                        cols = st.columns(6)
-            
-                        categories = [
-                            ("🏆 前3名", "top3", "#DC2626", len(analysis["top3"])),
-                            ("📄 首頁(4-10)", "top10", "#F59E0B", len(analysis["top10"])),
-                            ("📑 第2頁(11-20)", "top20", "#6B7280", len(analysis["top20"])),
-                            ("📋 第3頁(21-30)", "top30", "#9CA3AF", len(analysis["top30"])),
-                            (f"⚠️ >{warning_threshold}名", "warning", "#10B981", len(analysis["warning"])),
-                            ("❌ 未上榜", "na", "#10B981", len(analysis["na"]))
-                        ]
-            
-                        for i, (label, key, color, count) in enumerate(categories):
-                            with cols[i]:
-                                st.markdown(f"""
-                                <div style="text-align: center; padding: 0.5rem; background: white; border-radius: 8px; border-left: 3px solid {color};">
-                                    <div style="font-size: 1.5rem; font-weight: bold; color: {color};">{count}</div>
-                                    <div style="font-size: 0.75rem; color: #666;">{label}</div>
-                                </div>
-                                """, unsafe_allow_html=True)
-            
-                        st.markdown("---")
-            
-                        # ✅ 修改這裡：6 個 tabs
-                        detail_tabs = st.tabs([
-                            f"🏆 前3名 ({len(analysis['top3'])})",
-                            f"📄 首頁 ({len(analysis['top10'])})",
-                            f"📑 第2頁 ({len(analysis['top20'])})",
-                            f"📋 第3頁 ({len(analysis['top30'])})",
-                            f"⚠️ 警告 ({len(analysis['warning'])})",
-                            f"❌ 未上榜 ({len(analysis['na'])})"
-                        ])
-            
-                        with detail_tabs[0]:
-                            if analysis["top3"]:
-                                st.warning("⚠️ 競爭對手在這些關鍵字排名很高：")
-                                display_keyword_list(analysis["top3"], "rank-warning")
-                            else:
-                                st.success("競爭對手沒有排在前3名的關鍵字")
-            
-                        with detail_tabs[1]:
-                            if analysis["top10"]:
-                                st.warning("⚠️ 競爭對手在首頁：")
-                                display_keyword_list(analysis["top10"], "rank-top10")
-                            else:
-                                st.info("競爭對手沒有排在4-10名的關鍵字")
-            
-                        with detail_tabs[2]:
-                            if analysis["top20"]:
-                                display_keyword_list(analysis["top20"], "rank-top20")
-                            else:
-                                st.info("競爭對手沒有排在11-20名的關鍵字")
-            
-                        with detail_tabs[3]:
-                            if analysis["top30"]:
-                                display_keyword_list(analysis["top30"], "rank-top30")
-                            else:
-                                st.info("競爭對手沒有排在21-30名的關鍵字")
-            
-                        with detail_tabs[4]:
-                            if analysis["warning"]:
-                                st.success(f"✅ 競爭對手這些關鍵字排名差（>{warning_threshold}）：")
-                                display_keyword_list(analysis["warning"], "rank-warning")
-                            else:
-                                st.info("競爭對手沒有排名很差的關鍵字")
-            
-                        with detail_tabs[5]:
-                            if analysis["na"]:
-                                st.success("✅ 競爭對手在這些關鍵字沒有排名：")
-                                display_keyword_list(analysis["na"], "rank-na", show_rank=False)
-                            else:
-                                st.warning("競爭對手在所有關鍵字都有排名")
+                render_site_overview(result_competitors, site_details, warning_threshold, "competitor")
 
     # ============ Tab 1: 關鍵字管理 ============
 
@@ -1935,17 +2842,18 @@ if active_project:
                 else:
                     keywords_list = [k.strip() for k in new_group_keywords.split("\n") if k.strip()]
 
-                    project_data = load_project_data(active_project["id"])
-                    if "keyword_groups" not in project_data:
-                        project_data["keyword_groups"] = {}
-
-                    project_data["keyword_groups"][new_group_name] = {
-                        "keywords": keywords_list,
-                        "description": new_group_desc,
-                        "created": datetime.now().isoformat(),
-                        "updated": datetime.now().isoformat()
-                    }
-                    save_project_data(active_project["id"], project_data)
+                    with get_project_data_lock():
+                        project_data = load_project_data(active_project["id"])
+                        keyword_groups = {
+                            **project_data.get("keyword_groups", {}),
+                            new_group_name: {
+                                "keywords": keywords_list,
+                                "description": new_group_desc,
+                                "created": datetime.now().isoformat(),
+                                "updated": datetime.now().isoformat()
+                            }
+                        }
+                        save_project_data(active_project["id"], {**project_data, "keyword_groups": keyword_groups})
                     st.success(f"✅ 已儲存「{new_group_name}」（{len(keywords_list)} 個關鍵字）")
                     st.rerun()
 
@@ -1971,9 +2879,13 @@ if active_project:
 
                         with col2:
                             if st.button("🗑️ 刪除", key=f"delete_{group_name}", use_container_width=True):
-                                project_data = load_project_data(active_project["id"])
-                                del project_data["keyword_groups"][group_name]
-                                save_project_data(active_project["id"], project_data)
+                                with get_project_data_lock():
+                                    project_data = load_project_data(active_project["id"])
+                                    remaining_groups = {
+                                        name: group for name, group in project_data.get("keyword_groups", {}).items()
+                                        if name != group_name
+                                    }
+                                    save_project_data(active_project["id"], {**project_data, "keyword_groups": remaining_groups})
                                 st.success(f"✅ 已刪除「{group_name}」")
                                 st.rerun()
 
@@ -2001,23 +2913,17 @@ if active_project:
 
             st.markdown("### 📅 選擇查詢記錄")
 
-            record_options = []
-            for i, record in enumerate(reversed(history_records)):
-                record_idx = len(history_records) - 1 - i
-                display_name = get_record_display_name(record)
-                record_options.append((display_name, record_idx))
+            record_name_to_idx = get_record_name_index(
+                active_project["id"], get_project_file_signature(active_project["id"]), history_records
+            )
 
             selected_record_display = st.selectbox(
                 "選擇要分析的記錄",
-                options=[opt[0] for opt in record_options],
+                options=list(record_name_to_idx),
                 key="analysis_record_select"
             )
 
-            selected_record_idx = None
-            for display_name, idx in record_options:
-                if display_name == selected_record_display:
-                    selected_record_idx = idx
-                    break
+            selected_record_idx = record_name_to_idx.get(selected_record_display)
 
             if selected_record_idx is not None:
                 selected_record = history_records[selected_record_idx]
@@ -2047,78 +2953,32 @@ if active_project:
                         site_type = "🏠 我的網站" if analysis_site in tracked_my_sites else "🎯 競爭對手"
                         st.markdown(f"**{site_type}：** `{analysis_site}`")
 
-                        details = analyze_site_keywords_detail(rankings, analysis_site, analysis_warning_threshold,
-                                                               keyword_order_map)
-
-                        cols = st.columns(6)
-                        categories = [
-                            ("🏆 前3名", "top3", "#10B981"),
-                            ("📄 首頁(4-10)", "top10", "#3B82F6"),
-                            ("📑 第2頁(11-20)", "top20", "#F59E0B"),
-                            ("📋 第3頁(21-30)", "top30", "#8B5CF6"),
-                            (f"⚠️ >{analysis_warning_threshold}名", "warning", "#EF4444"),
-                            ("❌ 未上榜", "na", "#6B7280")
-                        ]
-
-                        for i, (label, key, color) in enumerate(categories):
-                            with cols[i]:
-                                count = len(details[key])
-                                st.markdown(f"""
-                                <div class="stat-card" style="border-left-color: {color};">
-                                    <div style="font-size: 1.8rem; font-weight: bold; color: {color};">{count}</div>
-                                    <div style="font-size: 0.8rem; color: #666;">{label}</div>
-                                </div>
-                                """, unsafe_allow_html=True)
+                        analysis_key = (active_project["id"], len(history_records), selected_record_idx,
+                                        selected_record.get("id"), analysis_site, analysis_warning_threshold)
+                        if st.session_state.get("analysis_key") == analysis_key:
+                            details = st.session_state["analysis_cache"]
+                        else:
+                            details = analyze_site_keywords_detail(rankings, analysis_site,
+                                                                   analysis_warning_threshold, keyword_order_map)
+                            st.session_state["analysis_key"] = analysis_key
+                            st.session_state["analysis_cache"] = details
+
+                        cards_html = "".join(
+                            f'<div class="stat-card" style="--accent: {SITE_DETAIL_CATEGORIES[key][0]};">'
+                            f'<div class="stat-num">{len(details[key])}</div>'
+                            f'<div class="stat-label">{card_label.format(threshold=analysis_warning_threshold)}</div></div>'
+                            for key, card_label, _ in SITE_OVERVIEW_CATEGORIES
+                        )
+                        st.markdown(f'<div class="stat-row wide">{cards_html}</div>', unsafe_allow_html=True)
 
                         st.markdown("---")
 
-                        detail_tabs = st.tabs([
-                            f"🏆 前3名 ({len(details['top3'])})",
-                            f"📄 首頁4-10 ({len(details['top10'])})",
-                            f"📑 第2頁11-20 ({len(details['top20'])})",
-                            f"📋 第3頁21-30 ({len(details['top30'])})",
-                            f"⚠️ 警告 ({len(details['warning'])})",
-                            f"❌ 未上榜 ({len(details['na'])})"
-                        ])
-
-                        with detail_tabs[0]:
-                            if details["top3"]:
-                                st.success("🏆 這些關鍵字排名很好！")
-                                display_keyword_list(details["top3"], "rank-top3")
-                            else:
-                                st.info("沒有排在前3名的關鍵字")
-
-                        with detail_tabs[1]:
-                            if details["top10"]:
-                                display_keyword_list(details["top10"], "rank-top10")
-                            else:
-                                st.info("沒有排在4-10名的關鍵字")
-
-                        with detail_tabs[2]:
-                            if details["top20"]:
-                                display_keyword_list(details["top20"], "rank-top20")
-                            else:
-                                st.info("沒有排在11-20名的關鍵字")
-
-                        with detail_tabs[3]:
-                            if details["top30"]:
-                                display_keyword_list(details["top30"], "rank-top30")
-                            else:
-                                st.info("沒有排在21-30名的關鍵字")
-
-                        with detail_tabs[4]:
-                            if details["warning"]:
-                                st.warning(f"⚠️ 以下 {len(details['warning'])} 個關鍵字排名超過 {analysis_warning_threshold}：")
-                                display_keyword_list(details["warning"], "rank-warning")
-                            else:
-                                st.success("沒有需要警告的關鍵字！")
-
-                        with detail_tabs[5]:
-                            if details["na"]:
-                                st.error("❌ 這些關鍵字完全沒有排名：")
-                                display_keyword_list(details["na"], "rank-na", show_rank=False)
-                            else:
-                                st.success("所有關鍵字都有排名！")
+                        selected_category = select_detail_category(
+                            {key: f"{option_label} ({len(details[key])})" for key, _, option_label in SITE_OVERVIEW_CATEGORIES},
+                            "detail_analysis_category"
+                        )
+                        render_category_keywords(SITE_DETAIL_CATEGORIES, selected_category, details[selected_category],
+                                                 analysis_warning_threshold)
 
                     st.markdown("---")
 
@@ -2129,20 +2989,27 @@ if active_project:
                     col1, col2 = st.columns(2)
                     with col1:
                         site_a = st.selectbox("選擇網站 A", all_sites_in_record, key="compete_site_a")
+                    site_a_normalized = normalize_domain(site_a) if site_a else None
                     with col2:
-                        site_b_options = [s for s in all_sites_in_record if
-                                          normalize_domain(s) != normalize_domain(site_a)]
+                        site_b_options = [s for s in all_sites_in_record if normalize_domain(s) != site_a_normalized]
                         site_b = st.selectbox("選擇網站 B",
                                               site_b_options if site_b_options else all_sites_in_record,
                                               key="compete_site_b")
 
-                    if site_a and site_b and normalize_domain(site_a) != normalize_domain(site_b):
+                    if site_a and site_b and site_a_normalized != normalize_domain(site_b):
                         site_a_type = "🏠 我的網站" if site_a in tracked_my_sites else "🎯 競爭對手"
                         site_b_type = "🏠 我的網站" if site_b in tracked_my_sites else "🎯 競爭對手"
 
                         st.markdown(f"**比較：** {site_a_type} `{site_a}` **vs** {site_b_type} `{site_b}`")
 
-                        competition = analyze_keyword_competition(rankings, site_a, site_b, keyword_order_map)
+                        competition_key = (active_project["id"], len(history_records), selected_record_idx,
+                                           selected_record.get("id"), site_a, site_b)
+                        if st.session_state.get("competition_key") == competition_key:
+                            competition = st.session_state["competition_cache"]
+                        else:
+                            competition = analyze_keyword_competition(rankings, site_a, site_b, keyword_order_map)
+                            st.session_state["competition_key"] = competition_key
+                            st.session_state["competition_cache"] = competition
 
                         winning = competition["winning"]
                         losing = competition["losing"]
@@ -2178,48 +3045,52 @@ if active_project:
                         with compete_tabs[0]:
                             if winning:
                                 st.success(f"🏆 {site_a} 在這些關鍵字領先：")
-                                win_data = [{
-                                    "關鍵字": item["keyword"],
-                                    f"{site_a} 排名": item["rank_a"],
-                                    f"{site_b} 排名": item["rank_b"],
-                                    "優勢": item["rank_b"] - item["rank_a"]
-                                } for item in winning]
-                                st.dataframe(pd.DataFrame(win_data), use_container_width=True, hide_index=True)
+                                ranks_a = [item["rank_a"] for item in winning]
+                                ranks_b = [item["rank_b"] for item in winning]
+                                win_df = pd.DataFrame({
+                                    "關鍵字": [item["keyword"] for item in winning],
+                                    f"{site_a} 排名": ranks_a,
+                                    f"{site_b} 排名": ranks_b,
+                                    "優勢": [b - a for a, b in zip(ranks_a, ranks_b)]
+                                })
+                                st.dataframe(win_df, use_container_width=True, hide_index=True)
                             else:
                                 st.info("沒有領先的關鍵字")
 
                         with compete_tabs[1]:
                             if losing:
                                 st.warning(f"😢 {site_a} 在這些關鍵字落後：")
-                                lose_data = [{
-                                    "關鍵字": item["keyword"],
-                                    f"{site_a} 排名": item["rank_a"],
-                                    f"{site_b} 排名": item["rank_b"],
-                                    "落後": item["rank_a"] - item["rank_b"]
-                                } for item in losing]
-                                st.dataframe(pd.DataFrame(lose_data), use_container_width=True, hide_index=True)
+                                ranks_a = [item["rank_a"] for item in losing]
+                                ranks_b = [item["rank_b"] for item in losing]
+                                lose_df = pd.DataFrame({
+                                    "關鍵字": [item["keyword"] for item in losing],
+                                    f"{site_a} 排名": ranks_a,
+                                    f"{site_b} 排名": ranks_b,
+                                    "落後": [a - b for a, b in zip(ranks_a, ranks_b)]
+                                })
+                                st.dataframe(lose_df, use_container_width=True, hide_index=True)
                             else:
                                 st.success("沒有落後的關鍵字！")
 
                         with compete_tabs[2]:
                             if only_a:
                                 st.success(f"✅ 只有 {site_a} 有排名：")
-                                only_a_data = [{
-                                    "關鍵字": item["keyword"],
-                                    f"{site_a} 排名": item["rank_a"]
-                                } for item in only_a]
-                                st.dataframe(pd.DataFrame(only_a_data), use_container_width=True, hide_index=True)
+                                only_a_df = pd.DataFrame({
+                                    "關鍵字": [item["keyword"] for item in only_a],
+                                    f"{site_a} 排名": [item["rank_a"] for item in only_a]
+                                })
+                                st.dataframe(only_a_df, use_container_width=True, hide_index=True)
                             else:
                                 st.info("沒有獨佔的關鍵字")
 
                         with compete_tabs[3]:
                             if only_b:
                                 st.warning(f"⚠️ 只有 {site_b} 有排名（需要加強）：")
-                                only_b_data = [{
-                                    "關鍵字": item["keyword"],
-                                    f"{site_b} 排名": item["rank_b"]
-                                } for item in only_b]
-                                st.dataframe(pd.DataFrame(only_b_data), use_container_width=True, hide_index=True)
+                                only_b_df = pd.DataFrame({
+                                    "關鍵字": [item["keyword"] for item in only_b],
+                                    f"{site_b} 排名": [item["rank_b"] for item in only_b]
+                                })
+                                st.dataframe(only_b_df, use_container_width=True, hide_index=True)
                             else:
                                 st.success("對手沒有獨佔的關鍵字！")
 
@@ -2235,259 +3106,27 @@ if active_project:
 
                         with compete_tabs[5]:
                             if both_ranked:
-                                both_data = [{
-                                    "關鍵字": item["keyword"],
-                                    f"{site_a} 排名": item["rank_a"],
-                                    f"{site_b} 排名": item["rank_b"],
-                                    "差距": item["diff"],
-                                    "狀態": "✅ 領先" if item["diff"] > 0 else ("😢 落後" if item["diff"] < 0 else "⚖️ 平手")
-                                } for item in both_ranked]
-                                st.dataframe(pd.DataFrame(both_data), use_container_width=True, hide_index=True)
+                                diffs = [item["diff"] for item in both_ranked]
+                                both_df = pd.DataFrame({
+                                    "關鍵字": [item["keyword"] for item in both_ranked],
+                                    f"{site_a} 排名": [item["rank_a"] for item in both_ranked],
+                                    f"{site_b} 排名": [item["rank_b"] for item in both_ranked],
+                                    "差距": diffs,
+                                    "狀態": ["✅ 領先" if diff > 0 else ("😢 落後" if diff < 0 else "⚖️ 平手") for diff in diffs]
+                                })
+                                st.dataframe(both_df, use_container_width=True, hide_index=True)
                             else:
                                 st.info("沒有雙方都有排名的關鍵字")
 
     # ============ Tab 3: 歷史記錄 ============
 
     elif st.session_state.current_tab == 3:
-        st.markdown("### 📜 歷史記錄")
-        st.caption(f"專案：{active_project['icon']} {active_project['name']}")
-
-        history_records = current_project_data.get("records", [])
-
-        if not history_records:
-            st.info("📊 還沒有歷史記錄")
-        else:
-            st.markdown(f"**共 {len(history_records)} 條記錄**")
-
-            history_warning_threshold = st.number_input(
-                "⚠️ 警告閾值",
-                min_value=10,
-                max_value=100,
-                value=20,
-                step=5,
-                key="history_warning_threshold"
-            )
-
-            st.markdown("---")
-
-            for i, record in enumerate(reversed(history_records)):
-                record_idx = len(history_records) - 1 - i
-                record_date = record.get("date", "未知")
-                record_time = record.get("time", "")
-                record_id = record.get("id", f"record_{i}")
-                keyword_count = len(record.get("rankings", []))
-
-                col1, col2, col3 = st.columns([4, 1, 1])
-
-                with col1:
-                    expander_title = f"📅 {record_date} {record_time} | {keyword_count}個關鍵字"
-
-                    with st.expander(expander_title, expanded=False):
-                        info_col1, info_col2 = st.columns(2)
-                        with info_col1:
-                            st.markdown("**🏠 網站：**")
-                            st.write(", ".join(record.get("my_sites", [])))
-                        with info_col2:
-                            st.markdown("**🎯 競爭對手：**")
-                            st.write(", ".join(record.get("competitors", [])))
-
-                        st.markdown("---")
-
-                        record_my_sites = record.get("my_sites", [])
-                        record_competitors = record.get("competitors", [])
-                        record_rankings = record.get("rankings", [])
-
-                        prev_rankings_dict = {}
-                        if record_idx > 0:
-                            prev_record = history_records[record_idx - 1]
-                            for item in prev_record.get("rankings", []):
-                                prev_rankings_dict[item.get("keyword")] = item
-
-                        df_display, styled_df = create_styled_ranking_dataframe(
-                            record_rankings,
-                            record_my_sites,
-                            record_competitors,
-                            history_warning_threshold,
-                            prev_rankings_dict
-                        )
-
-                        st.dataframe(styled_df, use_container_width=True, height=400)
-
-                        st.markdown("---")
-                        st.markdown("**📊 各網站排名統計：**")
-
-                        all_record_sites = record_my_sites + record_competitors
-                        keyword_order = get_keyword_order_map(record)
-
-                        for site in all_record_sites:
-                            site_analysis = analyze_site_keywords_detail(record_rankings, site,
-                                                                         history_warning_threshold, keyword_order)
-                            site_type = "🏠" if site in record_my_sites else "🎯"
-
-                            col_stats = st.columns(7)
-                            with col_stats[0]:
-                                st.markdown(f"**{site_type} {site[:20]}**")
-                            with col_stats[1]:
-                                st.markdown(f"🏆 {len(site_analysis['top3'])}")
-                            with col_stats[2]:
-                                st.markdown(f"📄 {len(site_analysis['top10'])}")
-                            with col_stats[3]:
-                                st.markdown(f"📑 {len(site_analysis['top20'])}")
-                            with col_stats[4]:
-                                st.markdown(f"📋 {len(site_analysis['top30'])}")
-                            with col_stats[5]:
-                                st.markdown(f"⚠️ {len(site_analysis['warning'])}")
-                            with col_stats[6]:
-                                st.markdown(f"❌ {len(site_analysis['na'])}")
-
-                with col2:
-                    excel_data = export_single_record(record)
-                    st.download_button(
-                        label="📥 Excel",
-                        data=excel_data,
-                        file_name=f"{active_project['name']}_{record_date}.xlsx",
-                        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                        key=f"dl_excel_{record_id}_{i}"
-                    )
-
-                with col3:
-                    if st.button("🗑️", key=f"del_record_{record_id}_{i}"):
-                        project_data = load_project_data(active_project["id"])
-                        project_data["records"] = [r for r in project_data["records"] if r.get("id") != record_id]
-                        save_project_data(active_project["id"], project_data)
-                        st.success("已刪除")
-                        st.rerun()
+        render_history_records(active_project, current_project_data)
 
     # ============ Tab 4: 管理 ============
 
     elif st.session_state.current_tab == 4:
-        st.markdown("### ⚙️ 專案數據管理")
-        st.caption(f"專案：{active_project['icon']} {active_project['name']}")
-
-        history_records = current_project_data.get("records", [])
-        keyword_groups = current_project_data.get("keyword_groups", {})
-
-        col1, col2, col3 = st.columns(3)
-
-        with col1:
-            st.markdown(f"""
-            <div class="stat-card">
-                <div style="font-size: 2rem; font-weight: bold; color: #667eea;">{len(history_records)}</div>
-                <div>總記錄數</div>
-            </div>
-            """, unsafe_allow_html=True)
-
-        with col2:
-            st.markdown(f"""
-            <div class="stat-card">
-                <div style="font-size: 2rem; font-weight: bold; color: #10B981;">{len(keyword_groups)}</div>
-                <div>關鍵字組</div>
-            </div>
-            """, unsafe_allow_html=True)
-
-        with col3:
-            total_keywords = sum(len(g.get("keywords", [])) for g in keyword_groups.values())
-            st.markdown(f"""
-            <div class="stat-card">
-                <div style="font-size: 2rem; font-weight: bold; color: #F59E0B;">{total_keywords}</div>
-                <div>總關鍵字數</div>
-            </div>
-            """, unsafe_allow_html=True)
-
-        st.markdown("---")
-
-        col1, col2 = st.columns(2)
-
-        with col1:
-            st.markdown("#### 📤 匯出專案數據")
-
-            if history_records or keyword_groups:
-                export_data = {
-                    "project": active_project,
-                    "data": current_project_data
-                }
-                json_data = json.dumps(export_data, ensure_ascii=False, indent=2)
-                st.download_button(
-                    label="📥 匯出完整專案 (JSON)",
-                    data=json_data,
-                    file_name=f"{active_project['name']}_backup_{datetime.now().strftime('%Y%m%d')}.json",
-                    mime="application/json",
-                    use_container_width=True
-                )
-
-                if history_records:
-                    all_records_output = BytesIO()
-                    with pd.ExcelWriter(all_records_output, engine="openpyxl") as writer:
-                        for idx, record in enumerate(history_records):
-                            sheet_name = f"{record.get('date', 'unknown')}_{idx}"[:31]
-                            df = pd.DataFrame(record.get("rankings", []))
-                            df.to_excel(writer, sheet_name=sheet_name, index=False)
-                    all_records_output.seek(0)
-
-                    st.download_button(
-                        label="📥 匯出所有記錄 (Excel)",
-                        data=all_records_output,
-                        file_name=f"{active_project['name']}_all_records_{datetime.now().strftime('%Y%m%d')}.xlsx",
-                        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                        use_container_width=True
-                    )
-
-        with col2:
-            st.markdown("#### 🗑️ 清除數據")
-
-            if st.button("🗑️ 清除所有記錄", type="secondary", use_container_width=True):
-                st.session_state["confirm_clear_records"] = True
-
-            if st.session_state.get("confirm_clear_records"):
-                st.warning("⚠️ 確定要清除所有歷史記錄嗎？")
-                col_yes, col_no = st.columns(2)
-                with col_yes:
-                    if st.button("確認清除", key="confirm_clear_yes"):
-                        project_data = load_project_data(active_project["id"])
-                        project_data["records"] = []
-                        save_project_data(active_project["id"], project_data)
-                        st.session_state.current_results = None
-                        del st.session_state["confirm_clear_records"]
-                        st.success("✅ 已清除所有記錄")
-                        st.rerun()
-                with col_no:
-                    if st.button("取消", key="confirm_clear_no"):
-                        del st.session_state["confirm_clear_records"]
-                        st.rerun()
-
-            if st.button("🗑️ 清除關鍵字組", type="secondary", use_container_width=True):
-                st.session_state["confirm_clear_groups"] = True
-
-            if st.session_state.get("confirm_clear_groups"):
-                st.warning("⚠️ 確定要清除所有關鍵字組嗎？")
-                col_yes, col_no = st.columns(2)
-                with col_yes:
-                    if st.button("確認清除", key="confirm_clear_groups_yes"):
-                        project_data = load_project_data(active_project["id"])
-                        project_data["keyword_groups"] = {}
-                        save_project_data(active_project["id"], project_data)
-                        del st.session_state["confirm_clear_groups"]
-                        st.success("✅ 已清除所有關鍵字組")
-                        st.rerun()
-                with col_no:
-                    if st.button("取消", key="confirm_clear_groups_no"):
-                        del st.session_state["confirm_clear_groups"]
-                        st.rerun()
-
-        st.markdown("---")
-
-        st.markdown("#### 📊 專案資訊")
-
-        st.markdown(f"""
-        | 項目 | 內容 |
-        |------|------|
-        | 專案名稱 | {active_project['name']} |
-        | 行業 | {active_project['industry']} |
-        | 創建時間 | {active_project.get('created', 'N/A')[:10]} |
-        | 最後更新 | {active_project.get('updated', 'N/A')[:10]} |
-        | 我的網站 | {', '.join(active_project.get('my_sites', [])) or '未設定'} |
-        | 競爭對手 | {', '.join(active_project.get('competitors', [])) or '未設定'} |
-        """)
+        render_project_data_manager(active_project, current_project_data)
 
 # ============ 頁尾 ============
 